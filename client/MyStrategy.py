@@ -3,11 +3,15 @@ from model.Game import Game
 from model.Move import Move
 from model.Wizard import Wizard
 from model.World import World
+from game_constants import GameConstants
+from spatial_hash import SpatialHash
 from main_classes import *
 
 class MyStrategy:
     
-    def __init__(self):
+    def __init__(self, constants=None):
+        self.constants = constants
+        self.units = SpatialHash(SPATIAL_HASH_CELL_SIZE) # world units of this tick
         self.actor = Actor(self)
         self.critic = Critic(self)
         ## actions
@@ -31,10 +35,13 @@ class MyStrategy:
         move.action = self.action
 
     def init_tick(self, me, world, game, move):
+        if self.constants is None: self.constants = GameConstants.from_game(game)
+        self.units.update(world)
         for o in [self, self.critic, self.actor]:
             o._me = me
             o._world = world
             o._game = game
+            o._constants = self.constants
         self._move = move
 
     def update(self):
@@ -49,7 +56,9 @@ class MyStrategy:
             self.dump_vars(self._move)
 
     def dump_vars(self, namespace):
-        var_list = [(v, namespace.__dict__[v]) for v in sorted(list(namespace.__dict__))]
+        names = set(getattr(namespace, '__dict__', ()))
+        for cls in type(namespace).__mro__: names.update(getattr(cls, '__slots__', ()))
+        var_list = [(v, getattr(namespace, v, None)) for v in sorted(names)]
         for n in self.__dict__:
             if self.__dict__[n] == namespace: name = n
         f = open(name+'_vars.txt', 'w')
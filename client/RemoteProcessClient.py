@@ -1,27 +1,33 @@
 import _socket
 import struct
 
-from model.Bonus import Bonus
+from config import COLUMNAR_WORLD, INCREMENTAL_WORLD, LAZY_SECTIONS, SLOTTED_MODEL
 from model.BonusType import BonusType
-from model.Building import Building
 from model.BuildingType import BuildingType
 from model.Faction import Faction
-from model.Game import Game
 from model.LaneType import LaneType
-from model.Message import Message
-from model.Minion import Minion
 from model.MinionType import MinionType
 from model.Player import Player
 from model.PlayerContext import PlayerContext
-from model.Projectile import Projectile
 from model.ProjectileType import ProjectileType
 from model.SkillType import SkillType
-from model.Status import Status
 from model.StatusType import StatusType
-from model.Tree import Tree
-from model.Wizard import Wizard
-from model.World import World
-
+from entity_store import EntityStore, IncrementalWorld
+from lazy_list import LazyList
+from world_arrays import BUILDING_TAIL_DTYPE, MINION_TAIL_DTYPE, ColumnarWorld, IndexedWorld, UnitArrays
+
+if SLOTTED_MODEL:
+    from slotted_model import Bonus, Building, Game, Message, Minion, Projectile, Status, Tree, Wizard
+else:
+    from model.Bonus import Bonus
+    from model.Building import Building
+    from model.Game import Game
+    from model.Message import Message
+    from model.Minion import Minion
+    from model.Projectile import Projectile
+    from model.Status import Status
+    from model.Tree import Tree
+    from model.Wizard import Wizard
 
 class RemoteProcessClient:
     LITTLE_ENDIAN_BYTE_ORDER = True
@@ -38,19 +44,70 @@ class RemoteProcessClient:
     LONG_SIZE_BYTES = 8
     DOUBLE_SIZE_BYTES = 8
 
+    RECEIVE_BUFFER_SIZE_BYTES = 1 << 16
+
+    ENUM_TABLES = {}
+
+    ## fixed-width record runs: id, x, y, speed_x, speed_y, angle, faction, radius[, life, max_life]
+    ## enum bytes are unpacked unsigned ("B") to index ENUM_TABLES directly
+    CIRCULAR_UNIT_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "q5dBd")
+    LIVING_UNIT_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "q5dBdii")
+    BONUS_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "q5dBdB")
+    BUILDING_TAIL_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "Bddiii")
+    MINION_TAIL_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "Bdiii")
+    PROJECTILE_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "q5dBdBqq")
+    STATUS_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "qBqqi")
+    ## present flag, speed, strafe_speed, turn, action, cast_angle, min/max_cast_distance, status_target_id,
+    ## skill_to_learn
+    MOVE_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "b3db3dqb")
+    WIZARD_TAIL_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "q?iiddii")
+    ## game fields before and after level_up_xp_values
+    GAME_HEAD_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "qid2?8didi7d4i5d15i2d")
+    GAME_TAIL_STRUCT = struct.Struct(BYTE_ORDER_FORMAT_STRING + "4d4i2di3d2i2di2di2di4d2i4d2i4d5id2i3di4d2idi")
+
     def __init__(self, host, port):
         self.socket = _socket.socket()
         self.socket.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, True)
         self.socket.connect((host, port))
+        self.init_buffers()
+
+    def init_buffers(self):
         self.trees = None
 
+        self.receive_buffer = bytearray(RemoteProcessClient.RECEIVE_BUFFER_SIZE_BYTES)
+        self.receive_view = memoryview(self.receive_buffer)
+        self.receive_offset = 0
+        self.receive_limit = 0
+        self.receive_mark = None
+        self.receive_base = 0
+
+        self.send_buffer = bytearray()
+
+        self.recording = None
+        self.recording_index = None
+
+        self.lazy = LAZY_SECTIONS
+        self.columnar = COLUMNAR_WORLD
+        self.wizard_arrays = UnitArrays(Wizard, RemoteProcessClient.to_enum)
+        self.minion_arrays = UnitArrays(Minion, RemoteProcessClient.to_enum, MINION_TAIL_DTYPE, MinionType)
+        self.building_arrays = UnitArrays(Building, RemoteProcessClient.to_enum, BUILDING_TAIL_DTYPE, BuildingType)
+        self.tree_arrays = UnitArrays(Tree, RemoteProcessClient.to_enum)
+
+        self.incremental = INCREMENTAL_WORLD
+        self.wizard_store = EntityStore(Wizard)
+        self.minion_store = EntityStore(Minion)
+        self.building_store = EntityStore(Building)
+        self.tree_store = EntityStore(Tree)
+
     def write_token_message(self, token):
         self.write_enum(RemoteProcessClient.MessageType.AUTHENTICATION_TOKEN)
         self.write_string(token)
+        self.flush()
 
     def write_protocol_version_message(self):
         self.write_enum(RemoteProcessClient.MessageType.PROTOCOL_VERSION)
         self.write_int(1)
+        self.flush()
 
     def read_team_size_message(self):
         message_type = self.read_enum(RemoteProcessClient.MessageType)
@@ -63,6 +120,11 @@ class RemoteProcessClient:
         return self.read_game()
 
     def read_player_context_message(self):
+        if self.recording_index is not None:
+            self.recording_index.write(struct.pack(
+                RemoteProcessClient.LONG_FORMAT_STRING, self.receive_base + self.receive_offset
+            ))
+
         message_type = self.read_enum(RemoteProcessClient.MessageType)
         if message_type == RemoteProcessClient.MessageType.GAME_OVER:
             return None
@@ -73,17 +135,33 @@ class RemoteProcessClient:
     def write_moves_message(self, moves):
         self.write_enum(RemoteProcessClient.MessageType.MOVE)
         self.write_moves(moves)
+        self.flush()
 
     def close(self):
         self.socket.close()
+        self.stop_recording()
+
+    def start_recording(self, path):
+        '''Copies all bytes received from now on to path, and stream offsets of player context messages
+        (little-endian longs) to path.idx. See replay_client.'''
+        self.recording = open(path, 'wb')
+        self.recording_index = open(path + '.idx', 'wb')
+
+    def stop_recording(self):
+        if self.recording is not None:
+            self.recording.close()
+            self.recording_index.close()
+            self.recording = None
+            self.recording_index = None
 
     def read_bonus(self):
         if not self.read_boolean():
             return None
 
+        id, x, y, speed_x, speed_y, angle, faction, radius, type = self.read_struct(RemoteProcessClient.BONUS_STRUCT)
+
         return Bonus(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_enum(BonusType)
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius, self.to_enum(BonusType, type)
         )
 
     def write_bonus(self, bonus):
@@ -103,6 +181,9 @@ class RemoteProcessClient:
             self.write_enum(bonus.type)
 
     def read_bonuses(self):
+        if self.lazy:
+            return self.read_lazy(RemoteProcessClient.skip_bonuses, RemoteProcessClient.read_bonuses)
+
         bonus_count = self.read_int()
         if bonus_count < 0:
             return None
@@ -127,11 +208,19 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Building(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_int(), self.read_int(),
-            self.read_statuses(), self.read_enum(BuildingType), self.read_double(), self.read_double(), self.read_int(),
-            self.read_int(), self.read_int()
+        return Building(*self.read_building_fields())
+
+    def read_building_fields(self):
+        id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life = \
+            self.read_struct(RemoteProcessClient.LIVING_UNIT_STRUCT)
+        statuses = self.read_statuses()
+        type, vision_range, attack_range, damage, cooldown_ticks, remaining_action_cooldown_ticks = \
+            self.read_struct(RemoteProcessClient.BUILDING_TAIL_STRUCT)
+
+        return (
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius, life, max_life, statuses,
+            self.to_enum(BuildingType, type), vision_range, attack_range, damage, cooldown_ticks,
+            remaining_action_cooldown_ticks
         )
 
     def write_building(self, building):
@@ -183,30 +272,11 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Game(
-            self.read_long(), self.read_int(), self.read_double(), self.read_boolean(), self.read_boolean(),
-            self.read_double(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_double(), self.read_int(), self.read_double(),
-            self.read_int(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_double(), self.read_int(), self.read_int(),
-            self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_int(), self.read_int(), self.read_int(),
-            self.read_int(), self.read_int(), self.read_int(), self.read_int(), self.read_int(), self.read_int(),
-            self.read_int(), self.read_int(), self.read_int(), self.read_int(), self.read_int(), self.read_double(),
-            self.read_double(), self.read_ints(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_int(), self.read_int(), self.read_int(), self.read_int(), self.read_double(),
-            self.read_double(), self.read_int(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_int(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_double(), self.read_double(),
-            self.read_int(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_int(), self.read_int(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_int(), self.read_int(), self.read_int(),
-            self.read_int(), self.read_double(), self.read_int(), self.read_int(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_int(), self.read_double(),
-            self.read_int()
-        )
+        head = self.read_struct(RemoteProcessClient.GAME_HEAD_STRUCT)
+        level_up_xp_values = self.read_ints()
+        tail = self.read_struct(RemoteProcessClient.GAME_TAIL_STRUCT)
+
+        return Game(*head, level_up_xp_values, *tail)
 
     def write_game(self, game):
         if game is None:
@@ -364,6 +434,9 @@ class RemoteProcessClient:
             self.write_byte_array(message.raw_message)
 
     def read_messages(self):
+        if self.lazy:
+            return self.read_lazy(RemoteProcessClient.skip_messages, RemoteProcessClient.read_messages)
+
         message_count = self.read_int()
         if message_count < 0:
             return None
@@ -388,11 +461,18 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Minion(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_int(), self.read_int(),
-            self.read_statuses(), self.read_enum(MinionType), self.read_double(), self.read_int(), self.read_int(),
-            self.read_int()
+        return Minion(*self.read_minion_fields())
+
+    def read_minion_fields(self):
+        id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life = \
+            self.read_struct(RemoteProcessClient.LIVING_UNIT_STRUCT)
+        statuses = self.read_statuses()
+        type, vision_range, damage, cooldown_ticks, remaining_action_cooldown_ticks = \
+            self.read_struct(RemoteProcessClient.MINION_TAIL_STRUCT)
+
+        return (
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius, life, max_life, statuses,
+            self.to_enum(MinionType, type), vision_range, damage, cooldown_ticks, remaining_action_cooldown_ticks
         )
 
     def write_minion(self, minion):
@@ -443,17 +523,11 @@ class RemoteProcessClient:
         if move is None:
             self.write_boolean(False)
         else:
-            self.write_boolean(True)
-
-            self.write_double(move.speed)
-            self.write_double(move.strafe_speed)
-            self.write_double(move.turn)
-            self.write_enum(move.action)
-            self.write_double(move.cast_angle)
-            self.write_double(move.min_cast_distance)
-            self.write_double(move.max_cast_distance)
-            self.write_long(move.status_target_id)
-            self.write_enum(move.skill_to_learn)
+            self.send_buffer += RemoteProcessClient.MOVE_STRUCT.pack(
+                1, move.speed, move.strafe_speed, move.turn, -1 if move.action is None else move.action,
+                move.cast_angle, move.min_cast_distance, move.max_cast_distance, move.status_target_id,
+                -1 if move.skill_to_learn is None else move.skill_to_learn
+            )
             self.write_messages(move.messages)
 
     def write_moves(self, moves):
@@ -488,6 +562,9 @@ class RemoteProcessClient:
             self.write_enum(player.faction)
 
     def read_players(self):
+        if self.lazy:
+            return self.read_lazy(RemoteProcessClient.skip_players, RemoteProcessClient.read_players)
+
         player_count = self.read_int()
         if player_count < 0:
             return None
@@ -548,10 +625,12 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
+        id, x, y, speed_x, speed_y, angle, faction, radius, type, owner_unit_id, owner_player_id = \
+            self.read_struct(RemoteProcessClient.PROJECTILE_STRUCT)
+
         return Projectile(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_enum(ProjectileType),
-            self.read_long(), self.read_long()
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius,
+            self.to_enum(ProjectileType, type), owner_unit_id, owner_player_id
         )
 
     def write_projectile(self, projectile):
@@ -597,7 +676,9 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Status(self.read_long(), self.read_enum(StatusType), self.read_long(), self.read_long(), self.read_int())
+        id, type, wizard_id, player_id, remaining_duration_ticks = self.read_struct(RemoteProcessClient.STATUS_STRUCT)
+
+        return Status(id, self.to_enum(StatusType, type), wizard_id, player_id, remaining_duration_ticks)
 
     def write_status(self, status):
         if status is None:
@@ -612,6 +693,9 @@ class RemoteProcessClient:
             self.write_int(status.remaining_duration_ticks)
 
     def read_statuses(self):
+        if self.lazy:
+            return self.read_lazy(RemoteProcessClient.skip_statuses, RemoteProcessClient.read_statuses)
+
         status_count = self.read_int()
         if status_count < 0:
             return None
@@ -636,9 +720,14 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Tree(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_int(), self.read_int(),
+        return Tree(*self.read_tree_fields())
+
+    def read_tree_fields(self):
+        id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life = \
+            self.read_struct(RemoteProcessClient.LIVING_UNIT_STRUCT)
+
+        return (
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius, life, max_life,
             self.read_statuses()
         )
 
@@ -686,11 +775,18 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return Wizard(
-            self.read_long(), self.read_double(), self.read_double(), self.read_double(), self.read_double(),
-            self.read_double(), self.read_enum(Faction), self.read_double(), self.read_int(), self.read_int(),
-            self.read_statuses(), self.read_long(), self.read_boolean(), self.read_int(), self.read_int(),
-            self.read_double(), self.read_double(), self.read_int(), self.read_int(), self.read_enums(SkillType),
+        return Wizard(*self.read_wizard_fields())
+
+    def read_wizard_fields(self):
+        id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life = \
+            self.read_struct(RemoteProcessClient.LIVING_UNIT_STRUCT)
+        statuses = self.read_statuses()
+        owner_player_id, me, mana, max_mana, vision_range, cast_range, xp, level = \
+            self.read_struct(RemoteProcessClient.WIZARD_TAIL_STRUCT)
+
+        return (
+            id, x, y, speed_x, speed_y, angle, self.to_enum(Faction, faction), radius, life, max_life, statuses,
+            owner_player_id, me, mana, max_mana, vision_range, cast_range, xp, level, self.read_skills(),
             self.read_int(), self.read_ints(), self.read_boolean(), self.read_messages()
         )
 
@@ -750,12 +846,89 @@ class RemoteProcessClient:
         if not self.read_boolean():
             return None
 
-        return World(
+        if self.columnar:
+            if self.incremental:
+                raise ValueError("Columnar and incremental world decoding can't be combined.")
+            return self.read_columnar_world()
+
+        if self.incremental:
+            return self.read_incremental_world()
+
+        return IndexedWorld(
             self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_players(),
             self.read_wizards(), self.read_minions(), self.read_projectiles(), self.read_bonuses(),
             self.read_buildings(), self.read_trees()
         )
 
+    def read_columnar_world(self):
+        return ColumnarWorld(
+            self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_players(),
+            self.read_unit_arrays(self.wizard_arrays, self.read_wizard_extras), self.read_unit_arrays(
+                self.minion_arrays, tail_size=RemoteProcessClient.MINION_TAIL_STRUCT.size
+            ), self.read_projectiles(), self.read_bonuses(), self.read_unit_arrays(
+                self.building_arrays, tail_size=RemoteProcessClient.BUILDING_TAIL_STRUCT.size
+            ), self.read_unit_arrays(self.tree_arrays, keep=True)
+        )
+
+    def read_unit_arrays(self, unit_arrays, read_extras=None, tail_size=0, keep=False):
+        '''Copies living unit records into unit_arrays. If the list is absent, returns None, or with keep
+        the last ones, as read_trees does. Null records are skipped.'''
+        unit_count = self.read_int()
+        if unit_count < 0:
+            return unit_arrays if keep else None
+
+        unit_arrays.clear(unit_count)
+        head_size = RemoteProcessClient.LIVING_UNIT_STRUCT.size
+
+        for _ in range(unit_count):
+            if not self.read_boolean():
+                continue
+
+            offset = self.claim_bytes(head_size)
+            unit_arrays.append_head(self.receive_view[offset:offset + head_size])
+            unit_arrays.statuses.append(self.read_statuses())
+
+            if tail_size:
+                offset = self.claim_bytes(tail_size)
+                unit_arrays.append_tail(self.receive_view[offset:offset + tail_size])
+
+            unit_arrays.extras.append(read_extras() if read_extras else ())
+
+        unit_arrays.finish()
+        return unit_arrays
+
+    def read_incremental_world(self):
+        return IncrementalWorld(
+            self.read_int(), self.read_int(), self.read_double(), self.read_double(), self.read_players(),
+            self.read_store(self.wizard_store, self.read_wizard_fields),
+            self.read_store(self.minion_store, self.read_minion_fields), self.read_projectiles(),
+            self.read_bonuses(), self.read_store(self.building_store, self.read_building_fields),
+            self.read_store(self.tree_store, self.read_tree_fields, keep=True)
+        )
+
+    def read_store(self, entity_store, read_fields, keep=False):
+        '''Updates entity_store units in place. If the list is absent, its units of this tick are None,
+        or with keep the last ones, as read_trees does. Null records are skipped.'''
+        unit_count = self.read_int()
+        if unit_count < 0:
+            if keep: entity_store.keep()
+            else: entity_store.skip()
+            return entity_store
+
+        entity_store.begin()
+
+        for _ in range(unit_count):
+            if self.read_boolean():
+                entity_store.update(read_fields())
+
+        entity_store.end()
+        return entity_store
+
+    def read_wizard_extras(self):
+        return self.read_struct(RemoteProcessClient.WIZARD_TAIL_STRUCT) + (
+            self.read_skills(), self.read_int(), self.read_ints(), self.read_boolean(), self.read_messages()
+        )
+
     def write_world(self, world):
         if world is None:
             self.write_boolean(False)
@@ -801,14 +974,28 @@ class RemoteProcessClient:
             raise ValueError("Received wrong message [actual=%s, expected=%s]." % (actual_type, expected_type))
 
     def read_enum(self, enum_class):
-        byte_array = self.read_bytes(RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
-        value = struct.unpack(RemoteProcessClient.BYTE_FORMAT_STRING, byte_array)[0]
+        offset = self.claim_bytes(RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+        return RemoteProcessClient.enum_table(enum_class)[self.receive_buffer[offset]]
+
+    @staticmethod
+    def to_enum(enum_class, value):
+        return RemoteProcessClient.enum_table(enum_class)[value & 0xFF]
+
+    @staticmethod
+    def enum_table(enum_class):
+        '''Returns a table of enum_class values (or None) indexed by the unsigned wire byte.'''
+        table = RemoteProcessClient.ENUM_TABLES.get(enum_class)
 
-        for enum_key, enum_value in enum_class.__dict__.items():
-            if not str(enum_key).startswith("__") and value == enum_value:
-                return enum_value
+        if table is None:
+            table = [None] * 256
 
-        return None
+            for enum_key, enum_value in enum_class.__dict__.items():
+                if not str(enum_key).startswith("__"):
+                    table[enum_value & 0xFF] = enum_value
+
+            table = RemoteProcessClient.ENUM_TABLES[enum_class] = tuple(table)
+
+        return table
 
     def read_byte_array(self, nullable):
         count = self.read_int()
@@ -834,12 +1021,67 @@ class RemoteProcessClient:
         if count < 0:
             return None
 
-        enums = []
+        offset = self.claim_bytes(count * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+        return list(map(RemoteProcessClient.enum_table(enum_class).__getitem__,
+                        self.receive_view[offset:offset + count]))
 
-        for _ in range(count):
-            enums.append(self.read_enum(enum_class))
+    def read_skills(self):
+        if self.lazy:
+            return self.read_lazy(RemoteProcessClient.skip_enums, RemoteProcessClient.read_skills)
+
+        return self.read_enums(SkillType)
+
+    def read_lazy(self, skip, read):
+        '''Skips a list with skip and returns a LazyList that decodes its bytes with read on first use.
+        Empty and absent lists are returned as is.'''
+        count = self.read_int()
+        if count <= 0:
+            return [] if count == 0 else None
+
+        ## the count is still buffered right before the cursor
+        self.receive_mark = self.receive_offset - RemoteProcessClient.INTEGER_SIZE_BYTES
+        skip(self, count)
+        data = bytes(self.receive_view[self.receive_mark:self.receive_offset])
+        self.receive_mark = None
+        return LazyList(RemoteProcessClient.decode_section, data, read)
+
+    @staticmethod
+    def decode_section(data, read):
+        return read(SectionReader(data))
+
+    def skip_bonuses(self, bonus_count):
+        for _ in range(bonus_count):
+            if self.read_boolean():
+                self.claim_bytes(RemoteProcessClient.BONUS_STRUCT.size)
 
-        return enums
+    def skip_enums(self, count):
+        self.claim_bytes(count * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+
+    def skip_messages(self, message_count):
+        for _ in range(message_count):
+            if self.read_boolean():
+                self.claim_bytes(2 * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+                self.skip_byte_array()
+
+    def skip_players(self, player_count):
+        for _ in range(player_count):
+            if self.read_boolean():
+                self.claim_bytes(RemoteProcessClient.LONG_SIZE_BYTES + RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+                self.skip_byte_array()
+                self.claim_bytes(
+                    RemoteProcessClient.INTEGER_SIZE_BYTES + 2 * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES
+                )
+
+    def skip_statuses(self, status_count):
+        for _ in range(status_count):
+            if self.read_boolean():
+                self.claim_bytes(RemoteProcessClient.STATUS_STRUCT.size)
+
+    def skip_byte_array(self):
+        count = self.read_int()
+
+        if count > 0:
+            self.claim_bytes(count)
 
     def read_enums_2d(self, enum_class):
         count = self.read_int()
@@ -895,12 +1137,14 @@ class RemoteProcessClient:
         self.write_bytes(byte_array)
 
     def read_boolean(self):
-        byte_array = self.read_bytes(RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
-        return struct.unpack(RemoteProcessClient.BYTE_FORMAT_STRING, byte_array)[0] != 0
+        offset = self.claim_bytes(RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+        return self.receive_buffer[offset] != 0
 
     def read_boolean_array(self, count):
-        byte_array = self.read_bytes(count * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
-        unpacked_bytes = struct.unpack(RemoteProcessClient.BYTE_ORDER_FORMAT_STRING + str(count) + "b", byte_array)
+        offset = self.claim_bytes(count * RemoteProcessClient.SIGNED_BYTE_SIZE_BYTES)
+        unpacked_bytes = struct.unpack_from(
+            RemoteProcessClient.BYTE_ORDER_FORMAT_STRING + str(count) + "b", self.receive_buffer, offset
+        )
 
         return [unpacked_bytes[i] != 0 for i in range(count)]
 
@@ -908,20 +1152,18 @@ class RemoteProcessClient:
         self.write_bytes(struct.pack(RemoteProcessClient.BYTE_FORMAT_STRING, 1 if value else 0))
 
     def read_int(self):
-        byte_array = self.read_bytes(RemoteProcessClient.INTEGER_SIZE_BYTES)
-        return struct.unpack(RemoteProcessClient.INT_FORMAT_STRING, byte_array)[0]
+        offset = self.claim_bytes(RemoteProcessClient.INTEGER_SIZE_BYTES)
+        return struct.unpack_from(RemoteProcessClient.INT_FORMAT_STRING, self.receive_buffer, offset)[0]
 
     def read_ints(self):
         count = self.read_int()
         if count < 0:
             return None
 
-        ints = []
-
-        for _ in range(count):
-            ints.append(self.read_int())
-
-        return ints
+        offset = self.claim_bytes(count * RemoteProcessClient.INTEGER_SIZE_BYTES)
+        return list(struct.unpack_from(
+            RemoteProcessClient.BYTE_ORDER_FORMAT_STRING + str(count) + "i", self.receive_buffer, offset
+        ))
 
     def read_ints_2d(self):
         count = self.read_int()
@@ -957,34 +1199,79 @@ class RemoteProcessClient:
                 self.write_ints(ints)
 
     def read_long(self):
-        byte_array = self.read_bytes(RemoteProcessClient.LONG_SIZE_BYTES)
-        return struct.unpack(RemoteProcessClient.LONG_FORMAT_STRING, byte_array)[0]
+        offset = self.claim_bytes(RemoteProcessClient.LONG_SIZE_BYTES)
+        return struct.unpack_from(RemoteProcessClient.LONG_FORMAT_STRING, self.receive_buffer, offset)[0]
 
     def write_long(self, value):
         self.write_bytes(struct.pack(RemoteProcessClient.LONG_FORMAT_STRING, value))
 
     def read_double(self):
-        byte_array = self.read_bytes(RemoteProcessClient.DOUBLE_SIZE_BYTES)
-        return struct.unpack(RemoteProcessClient.DOUBLE_FORMAT_STRING, byte_array)[0]
+        offset = self.claim_bytes(RemoteProcessClient.DOUBLE_SIZE_BYTES)
+        return struct.unpack_from(RemoteProcessClient.DOUBLE_FORMAT_STRING, self.receive_buffer, offset)[0]
 
     def write_double(self, value):
         self.write_bytes(struct.pack(RemoteProcessClient.DOUBLE_FORMAT_STRING, value))
 
-    def read_bytes(self, byte_count):
-        byte_array = bytes()
-
-        while len(byte_array) < byte_count:
-            chunk = self.socket.recv(byte_count - len(byte_array))
+    def read_struct(self, record_struct):
+        offset = self.claim_bytes(record_struct.size)
+        return record_struct.unpack_from(self.receive_buffer, offset)
 
-            if not len(chunk):
+    def read_bytes(self, byte_count):
+        offset = self.claim_bytes(byte_count)
+        return bytes(self.receive_view[offset:offset + byte_count])
+
+    def claim_bytes(self, byte_count):
+        '''Reserves next byte_count bytes of the receive buffer, returns their offset.
+        The bytes stay valid until the next claim, so callers unpack them in place.'''
+        offset = self.receive_offset
+
+        if self.receive_limit - offset < byte_count:
+            self.fill_receive_buffer(byte_count)
+            offset = self.receive_offset
+
+        self.receive_offset = offset + byte_count
+        return offset
+
+    def fill_receive_buffer(self, byte_count):
+        '''Receives until at least byte_count unread bytes are buffered.
+        Bytes after receive_mark, if set, are kept as well.'''
+        start = self.receive_offset if self.receive_mark is None else self.receive_mark
+        remaining = self.receive_limit - start
+        byte_count += self.receive_offset - start
+
+        if byte_count > self.receive_buffer.__len__():
+            receive_buffer = bytearray(max(byte_count, 2 * self.receive_buffer.__len__()))
+            receive_buffer[:remaining] = self.receive_view[start:self.receive_limit]
+            self.receive_view.release()
+            self.receive_buffer = receive_buffer
+            self.receive_view = memoryview(receive_buffer)
+        elif remaining and start:
+            self.receive_view[:remaining] = self.receive_view[start:self.receive_limit]
+
+        self.receive_base += start
+        self.receive_offset -= start
+        self.receive_limit = remaining
+        if self.receive_mark is not None:
+            self.receive_mark = 0
+
+        while self.receive_limit < byte_count:
+            chunk_size = self.socket.recv_into(self.receive_view[self.receive_limit:])
+
+            if not chunk_size:
                 raise IOError("Can't read %s bytes from input stream." % str(byte_count))
 
-            byte_array += chunk
+            if self.recording is not None:
+                self.recording.write(self.receive_view[self.receive_limit:self.receive_limit + chunk_size])
 
-        return byte_array
+            self.receive_limit += chunk_size
 
     def write_bytes(self, byte_array):
-        self.socket.sendall(byte_array)
+        self.send_buffer += byte_array
+
+    def flush(self):
+        '''Sends everything written since the last flush with a single sendall.'''
+        self.socket.sendall(self.send_buffer)
+        del self.send_buffer[:]
 
     class MessageType:
         UNKNOWN = 0
@@ -995,3 +1282,20 @@ class RemoteProcessClient:
         GAME_CONTEXT = 5
         PLAYER_CONTEXT = 6
         MOVE = 7
+
+
+for enum_class in (BonusType, BuildingType, Faction, LaneType, MinionType, ProjectileType, SkillType, StatusType,
+                   RemoteProcessClient.MessageType):
+    RemoteProcessClient.enum_table(enum_class)
+
+
+class SectionReader(RemoteProcessClient):
+    '''Reads a section copied out of the receive buffer.'''
+
+    def __init__(self, data):
+        self.receive_buffer = data
+        self.receive_view = memoryview(data)
+        self.receive_offset = 0
+        self.receive_limit = data.__len__()
+        self.receive_mark = None
+        self.lazy = False
@@ -1,30 +1,39 @@
 import sys
 
 from MyStrategy import MyStrategy
+from game_constants import GameConstants
 from RemoteProcessClient import RemoteProcessClient
+from config import RECORD_PATH
 from model.Move import Move
 
 
 class Runner:
-    def __init__(self):
-        if sys.argv.__len__() == 4:
+    def __init__(self, remote_process_client=None):
+        if remote_process_client is not None:
+            self.remote_process_client = remote_process_client
+            self.token = "0000000000000000"
+        elif sys.argv.__len__() == 4:
             self.remote_process_client = RemoteProcessClient(sys.argv[1], int(sys.argv[2]))
             self.token = sys.argv[3]
         else:
             self.remote_process_client = RemoteProcessClient("127.0.0.1", 31001)
             self.token = "0000000000000000"
 
+        if RECORD_PATH and remote_process_client is None:
+            self.remote_process_client.start_recording(RECORD_PATH)
+
     def run(self):
         try:
             self.remote_process_client.write_token_message(self.token)
             self.remote_process_client.write_protocol_version_message()
             team_size = self.remote_process_client.read_team_size_message()
             game = self.remote_process_client.read_game_context_message()
+            game_constants = GameConstants.from_game(game)
 
             strategies = []
 
             for _ in range(team_size):
-                strategies.append(MyStrategy())
+                strategies.append(MyStrategy(game_constants))
 
             while True:
                 player_context = self.remote_process_client.read_player_context_message()
@@ -49,4 +58,5 @@ class Runner:
             self.remote_process_client.close()
 
 
-Runner().run()
+if __name__ == '__main__':
+    Runner().run()
@@ -0,0 +1,476 @@
+import math
+import random
+import time
+import timeit
+import tracemalloc
+from queue import PriorityQueue
+from types import SimpleNamespace
+
+import numpy as np
+
+import flow_fields
+import helper_classes
+import slotted_model
+import spatial_hash
+import utilities
+import windowed_search
+from config import ALLIES_DISTANCE, ENEMIES_DISTANCE, MOVE_COST, MOVE_COST_DIAG, SPATIAL_HASH_CELL_SIZE, WAYPOINTS
+from RemoteProcessClient import RemoteProcessClient
+from model.Building import Building
+from model.BuildingType import BuildingType
+from model.Faction import Faction
+from model.Game import Game
+from model.Minion import Minion
+from model.MinionType import MinionType
+from model.Projectile import Projectile
+from model.ProjectileType import ProjectileType
+from model.SkillType import SkillType
+from model.Tree import Tree
+from model.Wizard import Wizard
+from sample_units import sample_building, sample_minion, sample_projectile, sample_tree, sample_wizard, sample_world
+
+############################# Benchmarks #############################
+
+class MemorySocket:
+    '''Socket stand-in: serves received bytes from memory, collects sent bytes.'''
+
+    def __init__(self, data=b''):
+        self.data   = bytes(data)
+        self.offset = 0
+        self.sent   = bytearray()
+
+    def recv_into(self, view):
+        n = min(len(view), len(self.data)-self.offset)
+        view[:n] = self.data[self.offset:self.offset+n]
+        self.offset += n
+        return n
+
+    def sendall(self, byte_array):
+        self.sent += byte_array
+
+    def close(self):
+        pass
+
+
+class MemoryClient(RemoteProcessClient):
+    '''RemoteProcessClient over a MemorySocket.'''
+
+    def __init__(self, data=b''):
+        self.socket = MemorySocket(data)
+        self.init_buffers()
+
+    def preload(self, data):
+        '''Puts data into the receive buffer, so reads skip the socket.'''
+        if len(data) > len(self.receive_buffer):
+            self.receive_view.release()
+            self.receive_buffer = bytearray(len(data))
+            self.receive_view = memoryview(self.receive_buffer)
+        self.receive_buffer[:len(data)] = data
+        self.rewind(len(data))
+
+    def rewind(self, limit):
+        self.receive_offset = 0
+        self.receive_limit = limit
+
+
+def encode(write, records):
+    '''Returns bytes written by a client write method for each of records.'''
+    client = MemoryClient()
+    for r in records: write(client, r)
+    client.flush()
+    return bytes(client.socket.sent)
+
+def run(label, fn, number, items=1):
+    '''Prints and returns the best time of fn per one of its items.'''
+    t = min(timeit.repeat(fn, number=number, repeat=5))/number/items
+    print('{:<40}{:>10.2f} us'.format(label, t*1e6))
+    return t
+
+############################# Record decoding #############################
+
+def read_tree_per_field(c):
+    '''Reference decoder: one read call per field.'''
+    if not c.read_boolean(): return None
+    return Tree(c.read_long(), c.read_double(), c.read_double(), c.read_double(), c.read_double(),
+                c.read_double(), c.read_enum(Faction), c.read_double(), c.read_int(), c.read_int(),
+                c.read_statuses())
+
+def read_minion_per_field(c):
+    if not c.read_boolean(): return None
+    return Minion(c.read_long(), c.read_double(), c.read_double(), c.read_double(), c.read_double(),
+                  c.read_double(), c.read_enum(Faction), c.read_double(), c.read_int(), c.read_int(),
+                  c.read_statuses(), c.read_enum(MinionType), c.read_double(), c.read_int(), c.read_int(),
+                  c.read_int())
+
+def read_building_per_field(c):
+    if not c.read_boolean(): return None
+    return Building(c.read_long(), c.read_double(), c.read_double(), c.read_double(), c.read_double(),
+                    c.read_double(), c.read_enum(Faction), c.read_double(), c.read_int(), c.read_int(),
+                    c.read_statuses(), c.read_enum(BuildingType), c.read_double(), c.read_double(),
+                    c.read_int(), c.read_int(), c.read_int())
+
+def read_projectile_per_field(c):
+    if not c.read_boolean(): return None
+    return Projectile(c.read_long(), c.read_double(), c.read_double(), c.read_double(), c.read_double(),
+                      c.read_double(), c.read_enum(Faction), c.read_double(), c.read_enum(ProjectileType),
+                      c.read_long(), c.read_long())
+
+def read_wizard_per_field(c):
+    if not c.read_boolean(): return None
+    return Wizard(c.read_long(), c.read_double(), c.read_double(), c.read_double(), c.read_double(),
+                  c.read_double(), c.read_enum(Faction), c.read_double(), c.read_int(), c.read_int(),
+                  c.read_statuses(), c.read_long(), c.read_boolean(), c.read_int(), c.read_int(),
+                  c.read_double(), c.read_double(), c.read_int(), c.read_int(), c.read_enums(SkillType),
+                  c.read_int(), c.read_ints(), c.read_boolean(), c.read_messages())
+
+def struct_fields(record_struct):
+    '''Returns format codes of record_struct, one per field.'''
+    codes, count = [], ''
+    for c in record_struct.format[1:]:
+        if c.isdigit(): count += c
+        else: codes.extend(c*int(count or 1)); count = ''
+    return codes
+
+def read_game_per_field(c, head, tail):
+    if not c.read_boolean(): return None
+    return Game(*[r() for r in head], c.read_ints(), *[r() for r in tail])
+
+def sample_game():
+    head = struct_fields(RemoteProcessClient.GAME_HEAD_STRUCT)
+    tail = struct_fields(RemoteProcessClient.GAME_TAIL_STRUCT)
+    return Game(*[0]*len(head), [0, 50, 100, 150, 200], *[0]*len(tail))
+
+def bench_record_decoding(count=200):
+    '''Per-record decode cost: one read per field vs precompiled struct runs.'''
+    rnd = random.Random(0)
+    cases = [
+        ('tree', sample_tree, RemoteProcessClient.write_tree,
+         read_tree_per_field, RemoteProcessClient.read_tree),
+        ('minion', sample_minion, RemoteProcessClient.write_minion,
+         read_minion_per_field, RemoteProcessClient.read_minion),
+        ('building', sample_building, RemoteProcessClient.write_building,
+         read_building_per_field, RemoteProcessClient.read_building),
+        ('projectile', sample_projectile, RemoteProcessClient.write_projectile,
+         read_projectile_per_field, RemoteProcessClient.read_projectile),
+        ('wizard', sample_wizard, RemoteProcessClient.write_wizard,
+         read_wizard_per_field, RemoteProcessClient.read_wizard)]
+    print('## record decoding, per record')
+    for name, sample, write, read_per_field, read_struct in cases:
+        data = encode(write, [sample(rnd, i) for i in range(count)])
+        client = MemoryClient()
+        client.preload(data)
+        for label, read in (('per field', read_per_field), ('struct', read_struct)):
+            def decode():
+                client.rewind(len(data))
+                for _ in range(count): read(client)
+            run('{} {}'.format(name, label), decode, 20, count)
+    ## game is decoded once per match, but it is the widest record
+    data = encode(RemoteProcessClient.write_game, [sample_game()])
+    client = MemoryClient()
+    client.preload(data)
+    readers = {'q': client.read_long, 'i': client.read_int, 'd': client.read_double, '?': client.read_boolean}
+    head = [readers[c] for c in struct_fields(RemoteProcessClient.GAME_HEAD_STRUCT)]
+    tail = [readers[c] for c in struct_fields(RemoteProcessClient.GAME_TAIL_STRUCT)]
+    run('game per field', lambda: (client.rewind(len(data)), read_game_per_field(client, head, tail)), 200)
+    run('game struct', lambda: (client.rewind(len(data)), client.read_game()), 200)
+
+def bench_lazy_sections():
+    '''World decode time with players, bonuses, statuses, skills and messages decoded eagerly vs lazily.'''
+    data = encode(RemoteProcessClient.write_world, [sample_world(random.Random(0))])
+    client = MemoryClient()
+    client.preload(data)
+    print('## world decoding, lazy sections')
+    for lazy in (False, True):
+        client.lazy = lazy
+        run('world {}'.format('lazy' if lazy else 'eager'),
+            lambda: (client.rewind(len(data)), client.read_world()), 50)
+    def decode_and_touch():
+        client.rewind(len(data))
+        world = client.read_world()
+        for o in world.minions+world.wizards: len(o.statuses)
+    run('world lazy, all statuses used', decode_and_touch, 50)
+
+
+def bench_model_classes(count=1000):
+    '''Construction time and memory per unit: __dict__ model classes vs slotted_model.'''
+    rnd = random.Random(0)
+    print('## model classes, per unit')
+    for name, sample in (('tree', sample_tree), ('minion', sample_minion), ('wizard', sample_wizard)):
+        args = [sample(rnd, i).__dict__ for i in range(count)]
+        args = [[a[k] for k in a] for a in args] # constructor order
+        plain = type(sample(rnd, 0))
+        for label, cls in (('dict', plain), ('slots', getattr(slotted_model, plain.__name__))):
+            run('{} {} construct'.format(name, label), lambda: [cls(*a) for a in args], 20, count)
+            tracemalloc.start()
+            units = [cls(*a) for a in args]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print('{:<40}{:>10.0f} B'.format('{} {} memory'.format(name, label), size/count))
+            del units
+
+############################# Path search #############################
+
+def sample_grid(rnd, node_width):
+    '''Grid updated with a sample world at node_width.'''
+    world = sample_world(rnd)
+    units = spatial_hash.SpatialHash(SPATIAL_HASH_CELL_SIZE)
+    units.update(world)
+    strategy = SimpleNamespace(_world=world, _me=world.wizards[0], actor=SimpleNamespace(target=None), units=units)
+    default, helper_classes.GRID_NODE_WIDTH = helper_classes.GRID_NODE_WIDTH, node_width
+    try:
+        grid = helper_classes.Grid(strategy)
+        grid.update()
+    finally:
+        helper_classes.GRID_NODE_WIDTH = default
+    return grid
+
+def search_path_reference(grid, nodes, start, goal):
+    '''Reference search: PriorityQueue, tuple nodes and dicts.'''
+
+    def neighbors(node):
+        res = [(node[0]+x, node[1]+y) for x in range(-1, 2) for y in range(-1,2) \
+               if  0 <= (node[0]+x) < nodes.shape[0] \
+               and 0 <= (node[1]+y) < nodes.shape[1] \
+               and (x != 0 or y != 0)]
+        return [node for node in res if node not in grid.walls]
+
+    def cost(node_from, node_to):
+        if node_from[0] == node_to[0] or node_from[1] == node_to[1]: move_cost = MOVE_COST
+        else: move_cost = MOVE_COST_DIAG
+        return move_cost+nodes[node_to]
+
+    def manhattan_dist(p1, p2):
+        dx, dy = abs(p1[0]-p2[0]), abs(p1[1]-p2[1])
+        if dx > dy: dx, dy = dy, dx
+        return dx*MOVE_COST_DIAG+(dy-dx)*MOVE_COST
+
+    frontier, came_from, cost_so_far, explored = PriorityQueue(), {start: start}, {start: 0}, {}
+    frontier.put((0, start))
+    while True:
+        while True:
+            if frontier.empty(): return []
+            current = frontier.get()[1]
+            if current not in explored: break
+        if current == goal:
+            path = []
+            while current != start:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path
+        explored[current] = True
+        for next_node in neighbors(current):
+            if next_node in explored: continue
+            new_cost = cost_so_far[current]+cost(current, next_node)
+            if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
+                cost_so_far[next_node] = new_cost
+                frontier.put((new_cost+manhattan_dist(next_node, goal), next_node))
+                came_from[next_node] = current
+
+def path_cost(nodes, start, path):
+    cost, prev = 0, start
+    for node in path:
+        cost += (MOVE_COST if node[0] == prev[0] or node[1] == prev[1] else MOVE_COST_DIAG)+nodes[node]
+        prev = node
+    return cost
+
+def bench_search_path(node_widths=(100, 50, 25, 20), routes=5):
+    '''Lane-length routes across the map: reference search vs utilities.search_path.'''
+    rnd = random.Random(0)
+    print('## path search, per route')
+    for node_width in node_widths:
+        grid = sample_grid(rnd, node_width)
+        size = grid.nodes.shape[0]
+        pairs = [((rnd.randrange(size//10), rnd.randrange(size-size//10, size)),
+                  (rnd.randrange(size-size//10, size), rnd.randrange(size//10))) for _ in range(routes)]
+        pairs = [(s, g) for s, g in pairs if g not in grid.walls]
+        for s, g in pairs:
+            assert utilities.search_path(grid, grid.nodes, s, g) == search_path_reference(grid, grid.nodes, s, g)
+        label = '{0}x{0}'.format(size)
+        number = 1 if size > 100 else 3
+        run(label+' reference', lambda: [search_path_reference(grid, grid.nodes, s, g) for s, g in pairs],
+            number, len(pairs))
+        run(label+' search_path', lambda: [utilities.search_path(grid, grid.nodes, s, g) for s, g in pairs],
+            number, len(pairs))
+        space = utilities.SearchSpace.get(grid.nodes.shape)
+        for s, g in pairs: # ties may break differently, costs may not
+            assert path_cost(grid.nodes, s, space.search_jump_points(grid.nodes, grid.walls.mask, s, g)) \
+                   == path_cost(grid.nodes, s, search_path_reference(grid, grid.nodes, s, g))
+        run(label+' jump points', lambda: [space.search_jump_points(grid.nodes, grid.walls.mask, s, g) \
+                                           for s, g in pairs], number, len(pairs))
+
+def bench_windowed_search(node_widths=(100, 50, 25), ticks=100, window=8):
+    '''Walks a corner to corner lane route while units drift: full grid search_path vs WindowedSearch.'''
+    rnd = random.Random(0)
+    print('## windowed search along a lane, per tick')
+    defaults = helper_classes.GRID_NODE_WIDTH, windowed_search.PATH_WINDOW_NODES
+    windowed_search.PATH_WINDOW_NODES = window
+    try:
+        for node_width in node_widths:
+            grid = sample_grid(rnd, node_width)
+            helper_classes.GRID_NODE_WIDTH = node_width
+            world, size = grid.strategy._world, grid.nodes.shape[0]
+            start, goal = (1, size-2), (size-2, 1)
+            planner = windowed_search.WindowedSearch()
+            full_time = window_time = 0.0
+            for tick in range(ticks):
+                for o in world.minions+world.wizards[1:]:
+                    o.x, o.y = o.x+rnd.uniform(-3, 3), o.y+rnd.uniform(-3, 3)
+                grid.update()
+                t0 = time.perf_counter()
+                utilities.search_path(grid, grid.nodes, start, goal)
+                t1 = time.perf_counter()
+                path = planner.search(grid, start, goal)
+                window_time, full_time = window_time+time.perf_counter()-t1, full_time+t1-t0
+                if not path: break
+                start = path[0]
+            label = '{0}x{0}'.format(size)
+            print('{:<40}{:>10.2f} us'.format(label+' search_path', full_time/(tick+1)*1e6))
+            print('{:<40}{:>10.2f} us'.format(label+' windowed', window_time/(tick+1)*1e6))
+    finally:
+        helper_classes.GRID_NODE_WIDTH, windowed_search.PATH_WINDOW_NODES = defaults
+
+def edit_world(rnd, world, tick):
+    '''Drifts minions and wizards, cuts a tree every few ticks and grows one every other few.'''
+    for o in world.minions+world.wizards[1:]:
+        o.x = min(max(o.x+rnd.uniform(-20, 20), 30), 3970)
+        o.y = min(max(o.y+rnd.uniform(-20, 20), 30), 3970)
+    if tick % 7 == 3 and world.trees: world.trees.pop(rnd.randrange(len(world.trees)))
+    if tick % 11 == 5: world.trees.append(sample_tree(rnd, 5000+tick))
+
+def check_incremental_search(node_widths=(100, 50), ticks=150):
+    '''D* Lite repairs of IncrementalSearch over changing costs and walls vs SearchSpace.search from
+    scratch: same path costs, paths of adjacent open nodes.'''
+    rnd = random.Random(0)
+    default = helper_classes.GRID_NODE_WIDTH
+    try:
+        for node_width in node_widths:
+            grid = sample_grid(rnd, node_width)
+            helper_classes.GRID_NODE_WIDTH = node_width
+            world, size = grid.strategy._world, grid.nodes.shape[0]
+            space, planner = utilities.SearchSpace.get(grid.nodes.shape), utilities.IncrementalSearch()
+            start, goal = (rnd.randrange(size), rnd.randrange(size)), (rnd.randrange(size), rnd.randrange(size))
+            for tick in range(ticks):
+                if tick % 50 == 49: goal = (rnd.randrange(size), rnd.randrange(size))
+                edit_world(rnd, world, tick)
+                grid.update()
+                if goal in grid.walls: continue
+                path = planner.search(grid, start, goal)
+                reference = space.search(grid.nodes, grid.walls.mask, start, goal)
+                assert bool(path) == bool(reference)
+                assert path_cost(grid.nodes, start, path) == path_cost(grid.nodes, start, reference)
+                for a, b in zip([start]+path, path):
+                    assert max(abs(a[0]-b[0]), abs(a[1]-b[1])) == 1 and b not in grid.walls
+                if path: start = path[0]
+    finally:
+        helper_classes.GRID_NODE_WIDTH = default
+    print('## incremental search matches search from scratch')
+
+def check_flow_fields(ticks=60):
+    '''Flow fields kept across static layer changes vs FlowFields.compute from scratch.'''
+    rnd = random.Random(0)
+    grid = sample_grid(rnd, 100)
+    world, flow = grid.strategy._world, flow_fields.FlowFields(WAYPOINTS)
+    flow.path(grid, (0, 0), (0, 0))
+    goals = sorted(flow.goals)
+    kept = 0
+    for tick in range(ticks):
+        fields = {goal: flow.field(grid, goal) for goal in goals}
+        edit_world(rnd, world, tick)
+        grid.update()
+        for goal in goals:
+            field = flow.field(grid, goal)
+            assert field == flow.compute(goal)
+            kept += field is fields[goal]
+    print('## flow fields match fields from scratch, {} of {} kept'.format(kept, ticks*len(goals)))
+
+############################# Unit queries #############################
+
+def nearby_scan(world, me, staff_range=70.0):
+    '''Reference queries of one wizard: allies, enemies and trees by scanning the world lists.'''
+    center = (me.x, me.y)
+    allies = [o for o in world.minions+world.wizards if o.faction == me.faction and o.id != me.id \
+              and utilities.distance(center, (o.x, o.y)) < ALLIES_DISTANCE]
+    enemies = [o for o in world.minions+world.buildings+world.wizards if o.faction not in (me.faction, 2, 3) \
+               and utilities.distance(center, (o.x, o.y)) < ENEMIES_DISTANCE]
+    trees = [o for o in world.trees if utilities.distance(center, (o.x, o.y)) < staff_range+o.radius]
+    return allies, enemies, trees
+
+def nearby_hash(units, me, staff_range=70.0):
+    center, enemies = (me.x, me.y), (1-me.faction,)
+    return (units.within(center, ALLIES_DISTANCE, ('minions', 'wizards'), (me.faction,), exclude=(me.id,)),
+            units.within(center, ENEMIES_DISTANCE, ('minions', 'buildings', 'wizards'), enemies),
+            units.within(center, staff_range, ('trees',), surface=True))
+
+def bench_spatial_hash(sizes=((40, 150), (200, 600), (400, 2000))):
+    '''Queries of all wizards in a tick: list scans vs building a SpatialHash and querying it.'''
+    rnd = random.Random(0)
+    print('## unit queries, per tick')
+    for minions, trees in sizes:
+        world = sample_world(rnd, minions, trees)
+        units = spatial_hash.SpatialHash(SPATIAL_HASH_CELL_SIZE)
+        units.update(world)
+        for me in world.wizards:
+            assert nearby_scan(world, me) == nearby_hash(units, me)
+            center = (me.x, me.y)
+            assert units.nearest(center, 5) == sorted(world.minions+world.buildings+world.wizards+world.trees,
+                key=lambda o: utilities.distance(center, (o.x, o.y)))[:5]
+        label = '{} units'.format(len(world.minions)+len(world.buildings)+len(world.wizards)+len(world.trees))
+        run(label+' list scans', lambda: [nearby_scan(world, me) for me in world.wizards], 10)
+        run(label+' spatial hash', lambda: (units.update(world), [nearby_hash(units, me) for me in world.wizards]), 10)
+        run(label+' nearest 5', lambda: [units.nearest((me.x, me.y), 5) for me in world.wizards], 10,
+            len(world.wizards))
+
+############################# Batch geometry #############################
+
+def geometry_scalar(wizards, units, half_sector, staff_range):
+    '''Reference: distance, relative angle, sector and range tests of each wizard to each unit.'''
+    res = []
+    for w in wizards:
+        d = [utilities.distance((w.x, w.y), (o.x, o.y)) for o in units]
+        a = [utilities.rel_angle(w.angle, math.atan2(o.y-w.y, o.x-w.x)) for o in units]
+        res.append((d, a, [abs(x) <= half_sector for x in a],
+                    [x <= w.cast_range+o.radius for x, o in zip(d, units)],
+                    [x <= staff_range+o.radius for x, o in zip(d, units)]))
+    return res
+
+def geometry_batch(wizards, units, half_sector, staff_range):
+    points, centers = utilities.positions(wizards), utilities.positions(units)
+    angles = [w.angle for w in wizards]
+    radii, cast_ranges = [o.radius for o in units], [w.cast_range for w in wizards]
+    return (utilities.distances(points, centers), utilities.angles_to(points, angles, centers),
+            utilities.in_sector(points, angles, centers, half_sector),
+            utilities.in_range(points, centers, cast_ranges, radii), utilities.in_range(points, centers, staff_range, radii))
+
+def bench_batch_geometry(sizes=((40, 150), (200, 600))):
+    '''All wizards against all units: scalar utilities in loops vs the batch forms.'''
+    rnd = random.Random(0)
+    print('## geometry of all wizards to all units, per tick')
+    half_sector, staff_range = math.pi/6, 70.0
+    for minions, trees in sizes:
+        world = sample_world(rnd, minions, trees)
+        units = world.minions+world.buildings+world.wizards+world.trees
+        scalar = geometry_scalar(world.wizards, units, half_sector, staff_range)
+        batch = geometry_batch(world.wizards, units, half_sector, staff_range)
+        for i, (d, a, sector, cast, staff) in enumerate(scalar):
+            assert list(batch[0][i]) == d and np.allclose(batch[1][i], a, rtol=0, atol=1e-12)
+            assert [list(b[i]) for b in batch[2:]] == [sector, cast, staff]
+        label = '{}x{} units'.format(len(world.wizards), len(units))
+        run(label+' scalar', lambda: geometry_scalar(world.wizards, units, half_sector, staff_range), 10)
+        run(label+' batch', lambda: geometry_batch(world.wizards, units, half_sector, staff_range), 10)
+        points, centers = utilities.positions(world.wizards), utilities.positions(units)
+        run(label+' distances only, scalar', lambda: [[utilities.distance((w.x, w.y), (o.x, o.y)) for o in units] \
+                                                      for w in world.wizards], 10)
+        run(label+' distances only, batch', lambda: utilities.distances(points, centers), 10)
+
+
+if __name__ == '__main__':
+    check_incremental_search()
+    check_flow_fields()
+    bench_record_decoding()
+    bench_lazy_sections()
+    bench_model_classes()
+    bench_search_path()
+    bench_windowed_search()
+    bench_spatial_hash()
+    bench_batch_geometry()
@@ -12,6 +12,15 @@ GRID_NODE_WIDTH = 100
 MOVE_COST = 10
 MOVE_COST_DIAG = 14
 MOVE_COST_UNCERTAIN = 7
+PATH_REPAIR_MAX_NODES = 300 # more changed grid nodes than this and the planner searches from scratch
+PATH_WINDOW_NODES = 0 # if set, paths are searched within this many nodes around the wizard
+PATH_JUMP_POINTS = False # whole grid searches by jump points, also instead of D* Lite on coarse grids; faster than A* only where few nodes have costs
+HPA_MIN_GRID_NODES = 6400 # finer grids are searched by the hierarchical planner
+HPA_CLUSTER_NODES = 10 # cluster width in nodes
+HPA_BUILD_BUDGET = 0.005 # seconds per tick for rebuilding clusters of the abstract graph, the first build is not limited
+HPA_REFINE_CLUSTERS = 4 # clusters of the abstract path refined every tick
+FLOW_FIELDS = False # follow lane flow fields to waypoints on grids up to HPA_MIN_GRID_NODES; some routes cost more than searched ones
+FLOW_PATH_NODES = 5 # path nodes taken from a lane flow field every tick
 PATH_DESTINATION_TOLERANCE = 3
 STRATEGY_WAYPOINT_TOLERANCE = 400
 ALLIES_DISTANCE = 300
@@ -23,6 +32,12 @@ FIGHTER_ENGAGE_DISTANCE_COEF = 0.7
 FIGHTER_TOO_CLOSE_DISTANCE = 200
 ENEMY_INJURED_HP_COEF = 0.75
 ENEMY_WEAK_HP_COEF = 0.35
+SPATIAL_HASH_CELL_SIZE = 200 # world units per cell of the unit index built every tick
+SLOTTED_MODEL = False # decode units into __slots__ classes from slotted_model
+COLUMNAR_WORLD = False # decode wizards, minions, buildings and trees into NumPy columns, see world_arrays
+INCREMENTAL_WORLD = False # update units in place across ticks, see entity_store; not with COLUMNAR_WORLD
+LAZY_SECTIONS = False # decode players, bonuses, statuses, skills and messages on first use; pays off only when they are many and unread, within noise on sample worlds
+RECORD_PATH = None # Runner records the server stream here, replay with replay_client.py
 
 WAYPOINTS = {
     'top': [(200, 3800), (200, 2700), (200, 1700), (200, 200), (1700, 200), (2700, 200), (3600, 400)],
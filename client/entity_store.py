@@ -0,0 +1,66 @@
+from collections import ChainMap
+from model.World import World
+
+############################# Entity store #############################
+
+class EntityStore:
+    '''Units of one type by id, kept across ticks and updated in place.'''
+
+    def __init__(self, unit_class):
+        self.unit_class = unit_class
+        self.units      = {}    # id -> unit
+        self.current    = []    # units of the last tick, in server order
+        self.added      = []    # ids that appeared in the last tick
+        self.removed    = []    # ids that disappeared in the last tick
+
+    def begin(self):
+        self.current    = []
+        self.added      = []
+
+    def update(self, fields):
+        '''fields are unit constructor arguments; reuses the unit with the same id.'''
+        unit = self.units.get(fields[0])
+        if unit is None:
+            unit = self.units[fields[0]] = self.unit_class(*fields)
+            self.added.append(fields[0])
+        else:
+            unit.__init__(*fields)
+        self.current.append(unit)
+
+    def end(self):
+        '''Drops units missing from this tick. Returns units of this tick.'''
+        if len(self.units) > len(self.current): # something is gone
+            seen = {o.id for o in self.current}
+            self.removed = [id for id in self.units if id not in seen]
+            for id in self.removed: del self.units[id]
+        else:
+            self.removed = []
+        return self.current
+
+    def keep(self):
+        '''The server did not send this list: units and ids stay, no changes.'''
+        self.added      = []
+        self.removed    = []
+        return self.current
+
+    def skip(self):
+        '''The server did not send this list: units of this tick are None, ids stay for the next one.'''
+        self.current    = None
+        self.added      = []
+        self.removed    = []
+        return self.current
+
+
+class IncrementalWorld(World):
+    '''World backed by EntityStore's. added and removed map list names to ids changed this tick,
+    by_id maps ids to units of this tick, lists the server did not send are None.'''
+
+    def __init__(self, tick_index, tick_count, width, height, players, wizard_store, minion_store, projectiles,
+                 bonuses, building_store, tree_store):
+        World.__init__(self, tick_index, tick_count, width, height, players, wizard_store.current,
+                       minion_store.current, projectiles, bonuses, building_store.current, tree_store.current)
+        stores = (('wizards', wizard_store), ('minions', minion_store),
+                  ('buildings', building_store), ('trees', tree_store))
+        self.added      = {name: store.added for name, store in stores}
+        self.removed    = {name: store.removed for name, store in stores}
+        self.by_id      = ChainMap(*(store.units for _, store in stores if store.current is not None))
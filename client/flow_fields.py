@@ -0,0 +1,106 @@
+import math
+import numpy as np
+from heapq import heappop, heappush
+from utilities import *
+from config import *
+
+############################# Flow fields #############################
+
+STEPS = tuple((x, y, MOVE_COST if x == 0 or y == 0 else MOVE_COST_DIAG) \
+              for x in range(-1, 2) for y in range(-1, 2) if x != 0 or y != 0)
+
+
+class FlowFields:
+    '''Costs to reach each lane waypoint from every grid node, by Dijkstra over the static layer of
+    the grid (trees and buildings). A field is recomputed when it is first used after a change of
+    the static layer that can alter it. A traveller steps to the neighbour with the lowest move cost,
+    current node cost and field, so minions and wizards are only a local correction.'''
+
+    def __init__(self, waypoints):
+        self.waypoints  = waypoints
+        self.space      = None
+        self.static     = None  # static node costs, -1 for walls
+        self.fields     = {}    # goal node -> (static it holds for, costs to goal by node index)
+
+    def path(self, grid, start, goal):
+        '''Returns FLOW_PATH_NODES nodes after start toward goal, or None if goal is not a waypoint
+        or the flow is blocked, then the grid has to be searched.'''
+        if FLOW_PATH_NODES <= 0: return None
+        nodes, walls = grid.nodes, grid.walls.mask
+        space = SearchSpace.get(nodes.shape)
+        if space is not self.space:
+            self.space  = space
+            self.goals  = {(int(x//GRID_NODE_WIDTH), int(y//GRID_NODE_WIDTH)) \
+                           for lane in self.waypoints.values() for x, y in lane}
+        if goal not in self.goals: return None
+        if not (0 <= start[0] < space.shape[0] and 0 <= start[1] < space.shape[1]): return None
+        field = self.field(grid, goal)
+
+        ## descend the field
+        node, path = start, []
+        for _ in range(FLOW_PATH_NODES):
+            if node == goal: break
+            best, best_node = math.inf, None
+            for dx, dy, move_cost in STEPS:
+                next_node = (node[0]+dx, node[1]+dy)
+                if not (0 <= next_node[0] < space.shape[0] and 0 <= next_node[1] < space.shape[1]) \
+                or walls[next_node]: continue
+                c = move_cost+nodes[next_node]+field[space.index(next_node)]
+                if c < best: best, best_node = c, next_node
+            ## no way closer to the goal around units
+            if best_node is None or field[space.index(best_node)] >= field[space.index(node)]: return None
+            path.append(best_node)
+            node = best_node
+        return path
+
+    def field(self, grid, goal):
+        static = grid.static.costs()
+        if self.static is None or not np.array_equal(static, self.static): self.static = static
+        computed, field = self.fields.get(goal, (None, None))
+        if computed is not self.static:
+            if field is None or self.affected(field, computed, self.static): field = self.compute(goal)
+            self.fields[goal] = (self.static, field)
+        return field
+
+    def affected(self, field, old, new):
+        '''True if static costs changing from old to new can change field. A node with a cost
+        increase matters if a neighbour's best move enters it, with a decrease if entering it would
+        be better than a neighbour's best move; nodes of other paths cannot pass it.'''
+        space = self.space
+        xs, ys = np.nonzero(old != new)
+        changed = (xs+1)*space.stride+ys+1
+        field = np.array(field)
+        enter_old = np.where(old[xs, ys] < 0, math.inf, old[xs, ys])
+        enter_new = np.where(new[xs, ys] < 0, math.inf, new[xs, ys])
+        inner = ~space.border.ravel()
+        for offset, move_cost in space.offsets:
+            neighbour = changed+offset
+            inside = inner[neighbour]
+            via_old = field[changed]+move_cost+enter_old
+            via_new = field[changed]+move_cost+enter_new
+            if (inside & (enter_new > enter_old) & (field[neighbour] == via_old)).any() \
+            or (inside & (enter_new < enter_old) & (field[neighbour] > via_new)).any(): return True
+        return False
+
+    def compute(self, goal):
+        '''Dijkstra from goal backwards: cost of moves from each node to goal, not counting the
+        node itself. Static walls can be left but not entered.'''
+        space = self.space
+        cost, closed = space.pad(self.static)
+        border = space.border.ravel().tolist()
+        field = [math.inf]*space.size
+        goal_i = space.index(goal)
+        field[goal_i] = 0
+        frontier = [(0, goal_i)]
+        while frontier:
+            g_node, node = heappop(frontier)
+            if g_node > field[node] or closed[node]: continue
+            g_node += cost[node]
+            for offset, move_cost in space.offsets:
+                prev_node = node+offset
+                if border[prev_node]: continue
+                new_cost = g_node+move_cost
+                if new_cost < field[prev_node]:
+                    field[prev_node] = new_cost
+                    heappush(frontier, (new_cost, prev_node))
+        return field
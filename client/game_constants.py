@@ -0,0 +1,26 @@
+import inspect
+from collections import namedtuple
+from model.Game import Game
+
+############################# Game constants #############################
+
+GAME_FIELDS = tuple(p for p in inspect.signature(Game.__init__).parameters if p != 'self')
+
+DERIVED_FIELDS = (
+    'half_staff_sector',        # max abs angle to a target for any action
+)
+
+
+class GameConstants(namedtuple('GameConstants', GAME_FIELDS+DERIVED_FIELDS)):
+    '''Immutable copy of Game with values the strategy derives from it.
+    Built once per match, hot code binds its fields as locals.'''
+
+    __slots__ = ()
+
+    @classmethod
+    def from_game(cls, game):
+        values = {f: getattr(game, f) for f in GAME_FIELDS}
+        values['level_up_xp_values'] = tuple(game.level_up_xp_values or ())
+        return cls(
+            half_staff_sector           = game.staff_sector/2,
+            **values)
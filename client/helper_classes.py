@@ -1,7 +1,9 @@
 import math
 import numpy as np
-from functools import reduce
 from utilities import *
+from flow_fields import FlowFields
+from hierarchical_search import HierarchicalSearch
+from windowed_search import WindowedSearch
 from config import *
 
 ############################# Helper classes #############################
@@ -12,6 +14,13 @@ class CruiseControl:
     def __init__(self, strategy):
         self.strategy   = strategy
         self.grid       = Grid(strategy)
+        if self.grid.nodes.size > HPA_MIN_GRID_NODES:   self.planner = HierarchicalSearch()
+        elif PATH_WINDOW_NODES:                         self.planner = WindowedSearch()
+        elif PATH_JUMP_POINTS:                          self.planner = FullSearch()
+        else:                                           self.planner = IncrementalSearch()
+        ## a field is a whole grid Dijkstra, too slow to compute within a tick on fine grids
+        if FLOW_FIELDS and self.grid.nodes.size <= HPA_MIN_GRID_NODES:  self.flow = FlowFields(WAYPOINTS)
+        else:                                                           self.flow = None
         self.center     = (0.0, 0.0)
         self.reset()
 
@@ -34,18 +43,9 @@ class CruiseControl:
             ## get path
             start = (int(self.center[0]//nw), int(self.center[1]//nw))
             goal = (int(self.destination[0]//nw), int(self.destination[1]//nw))
-            # ## search only in fraction of the grid
-            # grid_x0 = start[0]-8
-            # grid_y0 = start[1]-8
-            # grid_x1 = start[0]+9
-            # grid_y1 = start[0]+9
-            # if grid_x0 < 0: grid_x0 = 0
-            # if grid_y0 < 0: grid_y0 = 0
-            # if grid_x1 > GRID_WIDTH/GRID_NODE_WIDTH-1:  grid_x0 = GRID_WIDTH/GRID_NODE_WIDTH-1
-            # if grid_y1 > GRID_HEIGHT/GRID_NODE_WIDTH-1: grid_y0 = GRID_HEIGHT/GRID_NODE_WIDTH-1
-            # nodes = self.grid.nodes[grid_x0:grid_x1, grid_y0:grid_y1]
             if goal not in self.grid.walls:
-                path = search_path(self.grid, self.grid.nodes, start, goal)
+                path = self.flow.path(self.grid, start, goal) if self.flow else None # lane waypoints
+                if path is None: path = self.planner.search(self.grid, start, goal)
                 ## convert path nodes to world coordinates
                 self.path = [(node[0]*nw+nw//2, node[1]*nw+nw//2) for node in path]
             else:
@@ -57,41 +57,39 @@ class CruiseControl:
         self.strategy.speed, self.strategy.strafe_speed = self.get_speed()
 
     def update_move_vector(self):
-
-        def force(pos, f, dist=1, decay='none'):
-            '''pos is for angle; f, dist and decay are for magnitude.
-            decay: none, linear, poly. Returns force vector.'''
-            if decay == 'linear': f *= 1/(dist*FORCE_DECAY_LIN)
-            elif decay == 'poly': f *= 1/dist**FORCE_DECAY_POW
-            x, y = pos[0]-self.center[0], pos[1]-self.center[1]
-            a = math.atan2(y, x)
-            return f*math.cos(a), f*math.sin(a)
-
-        forces = []
+        '''Sums waypoint attraction and repulsion of nearby obstacles and map boundaries. Forces point
+        along unit vectors toward their sources; a unit vector of a source at the center is (1, 0).'''
+        cx, cy = self.center
+        fx = fy = 0.0
+        ## get collidables and map boundaries (top, left, right, bottom) repulsion
+        centers = np.concatenate((self.grid.obstacle_centers,
+                                  ((cx, 0), (0, cy), (GRID_WIDTH, cy), (cx, GRID_HEIGHT))))
+        radii   = np.concatenate((self.grid.obstacle_radii, (0, 0, 0, 0)))
+        offsets = centers.T-((cx,), (cy,))
+        lengths = np.sqrt(offsets[0]**2+offsets[1]**2)
+        d       = lengths-radii # distance from the boundary
+        near    = d < COLLIDABLE_MAX_DIST # only count nearby collidables
+        if near.any():
+            d, lengths, offsets = d[near], lengths[near], offsets[:, near]
+            ## inside a collidable the power of a negative distance is complex, its real part counts
+            f = FORCE_COLLIDABLE/np.abs(d)**FORCE_DECAY_POW*np.where(d < 0, math.cos(math.pi*FORCE_DECAY_POW), 1)
+            centered = lengths == 0
+            fx, fy = (offsets*(f/np.where(centered, 1, lengths))).sum(axis=1).tolist()
+            if centered.any(): fx += float(f[centered].sum())
         ## get waypoint attraction
-        if self.path: forces.append(force(self.path[0], FORCE_WAYPOINT))
-        ## get collidables repulsion
-        for o in self.grid.obstacles:
-            d = distance(self.center, o.center)-o.radius # distance from the boundary
-            if d < COLLIDABLE_MAX_DIST: # only count nearby collidables
-                forces.append(force(o.center, FORCE_COLLIDABLE, d, 'poly'))
-        ## get map boundaries repulsion
-        boundaries = [ \
-            Obstacle((self.center[0], 0), 0),           # top
-            Obstacle((0, self.center[1]), 0),           # left
-            Obstacle((GRID_WIDTH, self.center[1]), 0),  # right
-            Obstacle((self.center[0], GRID_HEIGHT), 0)] # bottom
-        for o in boundaries:
-            d = distance(self.center, o.center)
-            if d < COLLIDABLE_MAX_DIST: forces.append(force(o.center, FORCE_COLLIDABLE, d, 'poly'))
+        if self.path:
+            x, y = self.path[0][0]-cx, self.path[0][1]-cy
+            length = math.hypot(x, y)
+            if length: fx, fy = fx+FORCE_WAYPOINT*x/length, fy+FORCE_WAYPOINT*y/length
+            else: fx += FORCE_WAYPOINT
         ## resolve forces
-        f = reduce(np.add, forces, (0, 0)) 
-        if (f[0] == 0) and (f[1] == 0): # zero resulting force
+        if (fx == 0) and (fy == 0): # zero resulting force
             self.move_angle = self.strategy._me.angle
             self.move_vector = (0, 0)
         else:
-            self.move_angle = math.atan2(f[1], f[0]) # get force direction
-            self.move_vector = (math.cos(self.move_angle), math.sin(self.move_angle))
+            self.move_angle = math.atan2(fy, fx) # get force direction
+            length = math.hypot(fx, fy)
+            self.move_vector = (fx/length, fy/length)
 
     def get_speed(self):
         world_vec = np.array(self.move_vector).reshape((2,1)) # move vector (world)
@@ -104,65 +102,147 @@ class CruiseControl:
 
 
 class Grid:
+    '''Node costs and walls from unit footprints. Trees and buildings are kept in the static layer
+    across ticks, minions and wizards are rasterized to the dynamic layer every tick.'''
     
     def __init__(self, strategy):
         self.strategy   = strategy
         self.shape      = (GRID_WIDTH, GRID_HEIGHT)
         size_x          = int(self.shape[0]//GRID_NODE_WIDTH)
         size_y          = int(self.shape[1]//GRID_NODE_WIDTH)
-        self.nodes      = np.zeros((size_x, size_y), dtype = np.int)
-        self.walls      = []
-        self.obstacles  = []
+        self.nodes      = np.zeros((size_x, size_y), dtype = int)
+        self.walls      = Walls(self.nodes.shape)
+        self.static     = GridLayer(self.nodes.shape) # trees and buildings, by id
+        self.dynamic    = GridLayer(self.nodes.shape) # minions and wizards of this tick
+        self.obstacle_centers   = np.zeros((0, 2))
+        self.obstacle_radii     = np.zeros(0)
 
     def update(self):
-        self.nodes.fill(0)
         self.update_obstacles()
-        self.walls = []
-        dim = self.nodes.shape
-        
-        # update costs
-        for o in self.obstacles:
-            node_x0 = int((o.center[0]-o.radius)//GRID_NODE_WIDTH) # left
-            node_y0 = int((o.center[1]-o.radius)//GRID_NODE_WIDTH) # top
-            node_x1 = int((o.center[0]+o.radius)//GRID_NODE_WIDTH) # right
-            node_y1 = int((o.center[1]+o.radius)//GRID_NODE_WIDTH) # bottom
-        
-            ## process nodes covered by obstacle
-            for x in range(node_x0, node_x1+1):
-                for y in range(node_y0, node_y1+1):
-                    node = (x, y)
-                    if node in self.walls: continue # skip walls
-                    if not (0 <= x < dim[0]) or not (0 <= y < dim[1]): # index outside of the grid
-                        continue 
-                    node_center = ((x+0.5)*GRID_NODE_WIDTH, (y+0.5)*GRID_NODE_WIDTH)
-                    d = distance(node_center, o.center)
-                    if d > o.radius+GRID_NODE_WIDTH//2: continue # node is outside
-                    if d < o.radius: # node center is covered -> mark wall
-                        self.nodes[node] = GRID_NODE_WIDTH*MOVE_COST_UNCERTAIN
-                        self.walls.append(node)
-                    else: # node is partially covered
-                        cost = int(GRID_NODE_WIDTH//2+o.radius-d)*MOVE_COST_UNCERTAIN
-                        self.nodes[node] += cost
+        world       = self.strategy._world
+        target      = self.strategy.actor.target
+        excluded    = (self.strategy._me.id, target.id if target else None)
+
+        ## static layer: rasterize units that appeared, drop the ones gone (cut trees, lost sight)
+        static = {o.id: o for group in (world.buildings, world.trees) for o in group}
+        for id in [id for id in self.static.footprints if id not in static]: self.static.remove(id)
+        added = [o for id, o in static.items() if id not in self.static.footprints]
+        if added: self.static.add_all([o.id for o in added], self.rasterize(added))
+
+        ## dynamic layer
+        self.dynamic.fill(self.rasterize([o for group in (world.minions, world.wizards) for o in group \
+                                          if o.id not in excluded]))
+
+        ## combine: a node covered by any obstacle is a wall, others sum partial costs
+        cost = self.static.cost+self.dynamic.cost
+        wall_count = self.static.wall_count+self.dynamic.wall_count
+        if excluded[1] in self.static.footprints: # targeted tree or building is not an obstacle
+            GridLayer.apply(cost, wall_count, self.static.footprints[excluded[1]], -1)
+        np.greater(wall_count, 0, out=self.walls.mask)
+        self.nodes[...] = np.where(self.walls.mask, GRID_NODE_WIDTH*MOVE_COST_UNCERTAIN, cost)
+
+    def rasterize(self, units):
+        '''Returns footprints of units in one array per field: unit index, node x, node y, partial cost
+        and wall flag of each node a unit covers, in unit order. Each unit gets a window of nodes as
+        wide as the widest bounding box, node centers are broadcast against unit centers.'''
+        nw, dim = GRID_NODE_WIDTH, self.nodes.shape
+        if not units: return tuple(np.zeros(0, dtype=int) for _ in range(5))
+        ox, oy, r   = (np.array(a, dtype=float) for a in zip(*((o.x, o.y, o.radius) for o in units)))
+        ox, oy, r   = ox[:, None, None], oy[:, None, None], r[:, None, None]
+        x0, y0      = ((ox-r)//nw).astype(int), ((oy-r)//nw).astype(int) # left, top
+        x1, y1      = ((ox+r)//nw).astype(int), ((oy+r)//nw).astype(int) # right, bottom
+        steps       = np.arange(int(max((x1-x0).max(), (y1-y0).max()))+1)
+        xs, ys      = x0+steps[:, None], y0+steps[None, :]
+        xs, ys      = np.broadcast_arrays(xs, ys)
+        ## node center distance to unit center, as distance() computes it
+        d           = np.sqrt(((xs+0.5)*nw-ox)**2+((ys+0.5)*nw-oy)**2)
+        covered     = (xs <= x1) & (ys <= y1) & (0 <= xs) & (xs < dim[0]) & (0 <= ys) & (ys < dim[1]) \
+                      & (d <= r+nw//2)
+        walls       = d < r # node center is covered
+        costs       = np.where(walls, 0, (nw//2+r-d).astype(int)*MOVE_COST_UNCERTAIN)
+        unit        = np.nonzero(covered)[0]
+        return unit, xs[covered], ys[covered], costs[covered], walls[covered].astype(int)
 
     def update_obstacles(self):
-        self.obstacles = []
-        groups = [self.strategy._world.buildings,
-                  self.strategy._world.trees,
-                  self.strategy._world.minions,
-                  self.strategy._world.wizards]
-        if self.strategy.actor.target:
-            for group in groups:
-                self.obstacles.extend(Obstacle((o.x, o.y), o.radius) for o in group \
-                    if o.id != self.strategy._me.id and o.id != self.strategy.actor.target.id)
-        else:
-            for group in groups:
-                self.obstacles.extend(Obstacle((o.x, o.y), o.radius) for o in group \
-                    if o.id != self.strategy._me.id)
-
-
-
-class Obstacle:
-    
-    def __init__(self, position, radius):
-        self.center = position
-        self.radius = radius
+        '''Centers and radii of obstacles close enough to the wizard to repel it.'''
+        me, target = self.strategy._me, self.strategy.actor.target
+        excluded = (me.id, target.id) if target else (me.id,)
+        near = self.strategy.units.within((me.x, me.y), COLLIDABLE_MAX_DIST,
+                                          ('buildings', 'trees', 'minions', 'wizards'), exclude=excluded, surface=True)
+        self.obstacle_centers   = np.array([(o.x, o.y) for o in near], dtype=float).reshape((-1, 2))
+        self.obstacle_radii     = np.array([o.radius for o in near], dtype=float)
+
+
+class GridLayer:
+    '''Sum of unit footprints: partial costs and the number of units covering each node center.
+    A footprint is nodes x, y, partial costs and wall flags of one unit, see Grid.rasterize.'''
+
+    def __init__(self, shape):
+        self.cost       = np.zeros(shape, dtype=int)
+        self.wall_count = np.zeros(shape, dtype=int)
+        self.footprints = {} # id -> footprint
+
+    def costs(self):
+        '''Returns node costs with walls as -1.'''
+        return np.where(self.wall_count > 0, -1, self.cost)
+
+    @staticmethod
+    def apply(cost, wall_count, footprint, sign):
+        xs, ys, costs, walls = footprint
+        cost[xs, ys] += sign*costs
+        wall_count[xs, ys] += sign*walls
+
+    def add(self, id, footprint):
+        self.footprints[id] = footprint
+        GridLayer.apply(self.cost, self.wall_count, footprint, 1)
+
+    def remove(self, id):
+        GridLayer.apply(self.cost, self.wall_count, self.footprints.pop(id), -1)
+
+    def clear(self):
+        self.cost.fill(0)
+        self.wall_count.fill(0)
+        self.footprints = {}
+
+    def add_all(self, ids, footprints):
+        '''Adds rasterize output of units with ids.'''
+        unit, xs, ys, costs, walls = footprints
+        self.cost += self.sum(xs, ys, costs)
+        self.wall_count += self.sum(xs, ys, walls)
+        bounds = np.cumsum(np.bincount(unit, minlength=len(ids)))[:-1]
+        self.footprints.update(zip(ids, zip(*(np.split(a, bounds) for a in (xs, ys, costs, walls)))))
+
+    def fill(self, footprints):
+        '''Replaces the layer with the sum of rasterize output, without per unit footprints.'''
+        _, xs, ys, costs, walls = footprints
+        self.cost[...] = self.sum(xs, ys, costs)
+        self.wall_count[...] = self.sum(xs, ys, walls)
+        self.footprints = {}
+
+    def sum(self, xs, ys, values):
+        '''Returns values summed by node.'''
+        return np.bincount(xs*self.cost.shape[1]+ys, values, self.cost.size).astype(int).reshape(self.cost.shape)
+
+
+class Walls:
+    '''Wall nodes of a grid as a boolean mask aligned with Grid.nodes.'''
+
+    def __init__(self, shape):
+        self.mask = np.zeros(shape, dtype=bool)
+
+    def __contains__(self, node):
+        '''O(1); nodes outside of the grid are not walls.'''
+        return 0 <= node[0] < self.mask.shape[0] and 0 <= node[1] < self.mask.shape[1] \
+               and bool(self.mask[node[0], node[1]])
+
+    def __iter__(self):
+        return ((int(x), int(y)) for x, y in np.argwhere(self.mask))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
+
+    def add(self, node):
+        self.mask[node[0], node[1]] = True
+
+    def clear(self):
+        self.mask.fill(False)
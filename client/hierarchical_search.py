@@ -0,0 +1,227 @@
+import math
+import time
+import numpy as np
+from heapq import heappop, heappush
+from utilities import *
+from config import *
+
+############################# Hierarchical search #############################
+
+class HierarchicalSearch:
+    '''HPA* for fine grids. The grid is cut into square clusters of HPA_CLUSTER_NODES nodes; each free
+    stretch of a border between two clusters gets an entrance in its middle, and entrances of a
+    cluster are linked by their costs within it. This abstract graph is built from the static layer
+    of the grid (trees and buildings) and only clusters whose static nodes changed are rebuilt, within
+    HPA_BUILD_BUDGET seconds per tick, the first build is done at once. Until a rebuild is complete,
+    queries use the links left from the last one, as cost estimates refined below.
+    A query searches the abstract graph, then refines the path with current costs in the corridor of
+    the first HPA_REFINE_CLUSTERS clusters it crosses. The rest of the path are entrance nodes.'''
+
+    def __init__(self):
+        self.space = None
+
+    def search(self, grid, start, goal):
+        '''Same contract as search_path, except that nodes past the refined part are not adjacent.'''
+        nodes, walls = grid.nodes, grid.walls.mask
+        space = SearchSpace.get(nodes.shape)
+        if not (0 <= start[0] < space.shape[0] and 0 <= start[1] < space.shape[1]) \
+        or not (0 <= goal[0] < space.shape[0] and 0 <= goal[1] < space.shape[1]):
+            return space.search_full(nodes, walls, start, goal)
+        self.update_graph(grid, space)
+        abstract = self.search_abstract(space.index(start), space.index(goal))
+        if not abstract: return space.search_full(nodes, walls, start, goal)
+
+        ## refine through the corridor of the first clusters of the abstract path
+        corridor, target = [self.cluster(space.index(start))], len(abstract)-1
+        for i, node in enumerate(abstract):
+            cluster = self.cluster(node)
+            if cluster not in corridor:
+                if len(corridor) == HPA_REFINE_CLUSTERS:
+                    target = i-1
+                    break
+                corridor.append(cluster)
+        ## search the bounding box of the corridor, with nodes outside of it closed
+        c = HPA_CLUSTER_NODES
+        x0, y0 = min(x for x, _ in corridor)*c, min(y for _, y in corridor)*c
+        x1, y1 = (max(x for x, _ in corridor)+1)*c, (max(y for _, y in corridor)+1)*c
+        closed = np.ones((min(x1, space.shape[0])-x0, min(y1, space.shape[1])-y0), dtype=bool)
+        for cx, cy in corridor: closed[cx*c-x0:(cx+1)*c-x0, cy*c-y0:(cy+1)*c-y0] = False
+        closed |= walls[x0:x1, y0:y1]
+        x, y = space.node(abstract[target])
+        path = SearchSpace.get(closed.shape).search(nodes[x0:x1, y0:y1], closed, (start[0]-x0, start[1]-y0),
+                                                     (x-x0, y-y0))
+        if not path: return space.search_full(nodes, walls, start, goal) # corridor is blocked by units
+        return [(x+x0, y+y0) for x, y in path]+[space.node(node) for node in abstract[target+1:]]
+
+    ############################# Abstract graph #############################
+
+    def reset(self, space):
+        c = HPA_CLUSTER_NODES
+        self.space      = space
+        self.clusters   = (-(-space.shape[0]//c), -(-space.shape[1]//c))
+        self.static     = None  # static node costs, -1 for walls
+        self.cost       = None  # static costs by node index
+        self.closed     = None  # static walls and border by node index
+        self.borders    = {}    # (cluster, cluster) -> transitions [(node, node)]
+        self.inter      = {}    # node -> {node: cost} across borders
+        self.intra      = {}    # cluster -> {node: {node: cost}} within cluster
+        self.dirty      = set() # clusters to rebuild borders and links of
+        self.stale      = set() # clusters to rebuild links of
+
+    def cluster(self, node):
+        x, y = self.space.coords[node]
+        return (x//HPA_CLUSTER_NODES, y//HPA_CLUSTER_NODES)
+
+    def update_graph(self, grid, space):
+        '''Marks clusters where the static layer changed, rebuilds clusters within the budget, or all of
+        them on the first call.'''
+        if space is not self.space: self.reset(space)
+        static = grid.static.costs()
+        budget = HPA_BUILD_BUDGET if self.static is not None else math.inf
+        if self.static is None:
+            changed = np.ones(static.shape, dtype=bool)
+        else:
+            changed = static != self.static
+        if changed.any():
+            c = HPA_CLUSTER_NODES
+            xs, ys = np.nonzero(changed)
+            self.dirty.update(zip((xs//c).tolist(), (ys//c).tolist()))
+            self.static = static
+            self.cost, self.closed = space.pad(static)
+        ## rebuild
+        t0 = time.perf_counter()
+        while (self.dirty or self.stale) and time.perf_counter()-t0 < budget:
+            if self.dirty:
+                cluster = self.dirty.pop()
+                cx, cy = cluster
+                for other in ((cx-1, cy), (cx+1, cy), (cx, cy-1), (cx, cy+1)):
+                    if self.update_border(cluster, other): self.stale.add(other)
+            else:
+                cluster = self.stale.pop()
+            self.stale.discard(cluster)
+            self.update_links(cluster)
+
+    def update_border(self, a, b):
+        '''Rebuilds transitions between clusters a and b. Returns True if they changed.'''
+        if not (0 <= b[0] < self.clusters[0] and 0 <= b[1] < self.clusters[1]): return False
+        if b < a: a, b = b, a
+        c, space, closed = HPA_CLUSTER_NODES, self.space, self.closed
+        ## pairs of facing nodes along the border
+        if a[0] != b[0]: # b is right of a
+            x = b[0]*c
+            pairs = [(space.index((x-1, y)), space.index((x, y))) \
+                     for y in range(a[1]*c, min((a[1]+1)*c, space.shape[1]))]
+        else: # b is below a
+            y = b[1]*c
+            pairs = [(space.index((x, y-1)), space.index((x, y))) \
+                     for x in range(a[0]*c, min((a[0]+1)*c, space.shape[0]))]
+        ## an entrance in the middle of each free stretch
+        transitions, stretch = [], []
+        for pair in pairs+[None]:
+            if pair is not None and not closed[pair[0]] and not closed[pair[1]]:
+                stretch.append(pair)
+            elif stretch:
+                transitions.append(stretch[len(stretch)//2])
+                stretch = []
+        old = self.borders.get((a, b), [])
+        for n, m in old:
+            self.inter[n].pop(m, None)
+            self.inter[m].pop(n, None)
+        for n, m in transitions:
+            self.inter.setdefault(n, {})[m] = MOVE_COST+self.cost[m]
+            self.inter.setdefault(m, {})[n] = MOVE_COST+self.cost[n]
+        self.borders[(a, b)] = transitions
+        return transitions != old
+
+    def entrances(self, cluster):
+        cx, cy = cluster
+        res = {}
+        for a, b in (((cx-1, cy), cluster), (cluster, (cx+1, cy)), ((cx, cy-1), cluster), (cluster, (cx, cy+1))):
+            for n, m in self.borders.get((a, b), ()):
+                node = m if b == cluster else n
+                res[node] = True
+        return list(res)
+
+    def update_links(self, cluster):
+        entrances = self.entrances(cluster)
+        c = HPA_CLUSTER_NODES
+        if self.static[cluster[0]*c:(cluster[0]+1)*c, cluster[1]*c:(cluster[1]+1)*c].any():
+            ## a path back costs the same but for the entry costs of its ends, one search serves both ways
+            links, cost = {node: {} for node in entrances}, self.cost
+            for i, node in enumerate(entrances):
+                for other, c in self.costs_within(cluster, node, entrances[i:]).items():
+                    links[node][other] = c
+                    links[other][node] = c-cost[other]+cost[node]
+            self.intra[cluster] = links
+        else: # open ground: costs are plain distances
+            coords = self.space.coords
+            self.intra[cluster] = {node: {other: octile(coords[node], coords[other]) for other in entrances} \
+                                   for node in entrances}
+
+    def costs_within(self, cluster, source, targets, backward=False):
+        '''Dijkstra from source inside cluster on static costs. Returns {target: cost} of reachable
+        targets; with backward, costs are of moves from targets to source.'''
+        c, space, cost, closed = HPA_CLUSTER_NODES, self.space, self.cost, self.closed
+        x0, y0 = cluster[0]*c, cluster[1]*c
+        coords, offsets = space.coords, space.offsets
+        left = set(targets)
+        left.discard(source)
+        res = {source: 0} if source in targets else {}
+        g = {source: 0}
+        frontier = [(0, source)]
+        while frontier and left:
+            g_current, current = heappop(frontier)
+            if g_current > g[current]: continue
+            if current in left:
+                left.discard(current)
+                res[current] = g_current
+            ## backward moves enter current, forward moves enter next_node
+            enter = cost[current] if backward else 0
+            for offset, move_cost in offsets:
+                next_node = current+offset
+                if closed[next_node]: continue
+                x, y = coords[next_node]
+                if not (x0 <= x < x0+c and y0 <= y < y0+c): continue
+                new_cost = g_current+move_cost+(enter if backward else cost[next_node])
+                if new_cost < g.get(next_node, math.inf):
+                    g[next_node] = new_cost
+                    heappush(frontier, (new_cost, next_node))
+        return res
+
+    def search_abstract(self, start, goal):
+        '''A* over entrances, with start and goal linked to entrances of their clusters.
+        Returns node indices from the first node after start to goal.'''
+        start_cluster, goal_cluster = self.cluster(start), self.cluster(goal)
+        goal_entrances = self.entrances(goal_cluster)
+        start_links = self.costs_within(start_cluster, start, self.entrances(start_cluster)+[goal])
+        goal_links = self.costs_within(goal_cluster, goal, goal_entrances, backward=True)
+        coords, goal_xy = self.space.coords, self.space.coords[goal]
+
+        def neighbors(node):
+            if node == start: return list(start_links.items())+list(self.inter.get(node, {}).items())
+            res = list(self.intra[self.cluster(node)].get(node, {}).items())
+            res.extend(self.inter.get(node, {}).items())
+            if node in goal_links: res.append((goal, goal_links[node]))
+            return res
+
+        g, came_from, explored = {start: 0}, {start: start}, set()
+        frontier = [(0, start)]
+        while frontier:
+            current = heappop(frontier)[1]
+            if current in explored: continue
+            if current == goal:
+                path = []
+                while current != start:
+                    path.append(current)
+                    current = came_from[current]
+                path.reverse()
+                return path
+            explored.add(current)
+            for next_node, move_cost in neighbors(current):
+                if next_node in explored: continue
+                new_cost = g[current]+move_cost
+                if new_cost < g.get(next_node, math.inf):
+                    g[next_node] = new_cost
+                    came_from[next_node] = current
+                    heappush(frontier, (new_cost+octile(coords[next_node], goal_xy), next_node))
+        return []
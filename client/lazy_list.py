@@ -0,0 +1,49 @@
+############################# Lazy list #############################
+
+class LazyList:
+    '''Read-only list whose items are produced by decode(*args) on first use.'''
+
+    __slots__ = ('decode', 'args', 'items')
+
+    def __init__(self, decode, *args):
+        self.decode = decode
+        self.args   = args
+        self.items  = None
+
+    def get(self):
+        '''Returns decoded items as a list.'''
+        if self.items is None:
+            self.items  = self.decode(*self.args)
+            self.args   = None
+        return self.items
+
+    def __len__(self):
+        return len(self.get())
+
+    def __bool__(self):
+        return bool(self.get())
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __reversed__(self):
+        return reversed(self.get())
+
+    def __getitem__(self, i):
+        return self.get()[i]
+
+    def __contains__(self, item):
+        return item in self.get()
+
+    def __eq__(self, other):
+        if isinstance(other, LazyList): other = other.get()
+        return self.get() == other
+
+    def __repr__(self):
+        return repr(self.get())
+
+    def index(self, item, *args):
+        return self.get().index(item, *args)
+
+    def count(self, item):
+        return self.get().count(item)
@@ -0,0 +1,193 @@
+import _socket
+import argparse
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from RemoteProcessClient import RemoteProcessClient
+from game_constants import GAME_FIELDS
+from model.ActionType import ActionType
+from model.Game import Game
+from model.Move import Move
+from model.PlayerContext import PlayerContext
+from model.SkillType import SkillType
+from replay_client import ReplayClient
+from sample_units import sample_world
+
+############################# Local server #############################
+
+MessageType = RemoteProcessClient.MessageType
+
+
+class ServerConnection(RemoteProcessClient):
+    '''Server side of the protocol over an accepted socket.'''
+
+    def __init__(self, sock):
+        self.socket = sock
+        self.socket.setsockopt(_socket.IPPROTO_TCP, _socket.TCP_NODELAY, True)
+        self.init_buffers()
+
+    def read_token_message(self):
+        self.ensure_message_type(self.read_enum(MessageType), MessageType.AUTHENTICATION_TOKEN)
+        return self.read_string()
+
+    def read_protocol_version_message(self):
+        self.ensure_message_type(self.read_enum(MessageType), MessageType.PROTOCOL_VERSION)
+        return self.read_int()
+
+    def write_team_size_message(self, team_size):
+        self.write_enum(MessageType.TEAM_SIZE)
+        self.write_int(team_size)
+        self.flush()
+
+    def write_game_context_message(self, game):
+        self.write_enum(MessageType.GAME_CONTEXT)
+        self.write_game(game)
+        self.flush()
+
+    def write_player_context_message(self, player_context):
+        self.write_enum(MessageType.PLAYER_CONTEXT)
+        self.write_player_context(player_context)
+        self.flush()
+
+    def write_game_over_message(self):
+        self.write_enum(MessageType.GAME_OVER)
+        self.flush()
+
+    def read_moves_message(self):
+        self.ensure_message_type(self.read_enum(MessageType), MessageType.MOVE)
+        move_count = self.read_int()
+        if move_count < 0:
+            return None
+        return [self.read_move() for _ in range(move_count)]
+
+    def read_move(self):
+        if not self.read_boolean():
+            return None
+        move = Move()
+        move.speed, move.strafe_speed, move.turn = self.read_double(), self.read_double(), self.read_double()
+        move.action = self.read_enum(ActionType)
+        move.cast_angle, move.min_cast_distance = self.read_double(), self.read_double()
+        move.max_cast_distance = self.read_double()
+        move.status_target_id = self.read_long()
+        move.skill_to_learn = self.read_enum(SkillType)
+        move.messages = self.read_messages()
+        return move
+
+############################# Worlds #############################
+
+def synthetic_game():
+    '''Game with the documented values of constants the strategy uses, zeros elsewhere.'''
+    values = dict.fromkeys(GAME_FIELDS, 0)
+    values.update(
+        tick_count=20000, map_size=4000.0, wizard_radius=35.0, wizard_cast_range=500.0,
+        wizard_vision_range=600.0, wizard_forward_speed=4.0, wizard_backward_speed=3.0,
+        wizard_strafe_speed=3.0, wizard_base_life=100, wizard_base_mana=100, wizard_max_turn_angle=math.pi/30,
+        wizard_action_cooldown_ticks=30, staff_cooldown_ticks=60, magic_missile_cooldown_ticks=60,
+        magic_missile_manacost=12, staff_damage=12, staff_sector=math.pi/3, staff_range=70.0,
+        level_up_xp_values=[50, 100, 150, 200, 250], minion_radius=25.0, minion_vision_range=400.0,
+        minion_speed=3.0, minion_life=100, magic_missile_radius=10.0, magic_missile_speed=40.0,
+        magic_missile_direct_damage=12, guardian_tower_radius=50.0, faction_base_radius=100.0)
+    return Game(**values)
+
+class SyntheticWorlds:
+    '''Random world whose units drift every tick; the player's wizard follows its moves.'''
+
+    def __init__(self, game, seed=0, minions=40, trees=150):
+        self.game   = game
+        self.rnd    = random.Random(seed)
+        self.world  = sample_world(self.rnd, minions, trees)
+        self.me     = [o for o in self.world.wizards if o.me][0]
+
+    def next_tick(self, tick_index):
+        rnd = self.rnd
+        self.world.tick_index = tick_index
+        for o in self.world.minions+self.world.wizards:
+            if o is self.me: continue
+            o.x = min(max(o.x+rnd.uniform(-3, 3), o.radius), 4000-o.radius)
+            o.y = min(max(o.y+rnd.uniform(-3, 3), o.radius), 4000-o.radius)
+        return PlayerContext([self.me], self.world)
+
+    def apply(self, moves):
+        move, me, g = moves[0], self.me, self.game
+        me.angle += min(max(move.turn, -g.wizard_max_turn_angle), g.wizard_max_turn_angle)
+        speed = min(max(move.speed, -g.wizard_backward_speed), g.wizard_forward_speed)
+        strafe = min(max(move.strafe_speed, -g.wizard_strafe_speed), g.wizard_strafe_speed)
+        me.x += math.cos(me.angle)*speed-math.sin(me.angle)*strafe
+        me.y += math.sin(me.angle)*speed+math.cos(me.angle)*strafe
+        me.x = min(max(me.x, me.radius), 4000-me.radius)
+        me.y = min(max(me.y, me.radius), 4000-me.radius)
+
+############################# Serving #############################
+
+def serve(port, ticks, tick_rate, replay=None, spawn_client=False):
+    '''Serves one game; returns per-tick round-trip latencies in seconds.'''
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', port))
+    listener.listen(1)
+    if spawn_client:
+        runner = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Runner.py')
+        client = subprocess.Popen([sys.executable, runner, '127.0.0.1', str(port), '0'*16])
+    conn = ServerConnection(listener.accept()[0])
+    listener.close()
+    conn.read_token_message()
+    conn.read_protocol_version_message()
+
+    if replay:
+        recording = ReplayClient(replay)
+        offsets = recording.tick_offsets
+        ## team size and game context precede the first indexed tick, the last one is game over
+        conn.write_bytes(recording.receive_view[:offsets[0]])
+        conn.flush()
+        ticks = min(ticks, len(offsets)-1)
+        send_tick = lambda i: (conn.write_bytes(recording.receive_view[offsets[i]:offsets[i+1]]), conn.flush())
+        apply_moves = lambda moves: None
+    else:
+        game = synthetic_game()
+        worlds = SyntheticWorlds(game)
+        conn.write_team_size_message(1)
+        conn.write_game_context_message(game)
+        send_tick = lambda i: conn.write_player_context_message(worlds.next_tick(i))
+        apply_moves = worlds.apply
+
+    latencies = []
+    period = 1.0/tick_rate if tick_rate else 0.0
+    next_tick = time.perf_counter()
+    for i in range(ticks):
+        if period:
+            time.sleep(max(0.0, next_tick-time.perf_counter()))
+            next_tick += period
+        start = time.perf_counter()
+        send_tick(i)
+        moves = conn.read_moves_message()
+        latencies.append(time.perf_counter()-start)
+        apply_moves(moves)
+
+    conn.write_game_over_message()
+    conn.close()
+    if replay: recording.close()
+    if spawn_client: client.wait()
+    return latencies
+
+def report(latencies):
+    t = sorted(latencies)
+    if not t: return
+    pct = lambda p: t[min(len(t)-1, int(p*len(t)))]*1e3
+    print('{} ticks, round trip ms: mean {:.2f}, p50 {:.2f}, p95 {:.2f}, max {:.2f}; {:.1f} ticks/s'.format(
+        len(t), sum(t)/len(t)*1e3, pct(0.5), pct(0.95), t[-1]*1e3, len(t)/sum(t)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the game server.')
+    parser.add_argument('--port', type=int, default=31001)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=0, help='ticks per second, 0 is as fast as possible')
+    parser.add_argument('--replay', help='serve a recording made with config.RECORD_PATH')
+    parser.add_argument('--client', action='store_true', help='start Runner.py against this server')
+    args = parser.parse_args()
+    report(serve(args.port, args.ticks, args.rate, args.replay, args.client))
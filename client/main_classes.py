@@ -1,11 +1,18 @@
 from model.ActionType import ActionType
+from model.Faction import Faction
 import math
+import numpy as np
 from helper_classes import *
 from utilities import *
 from config import *
 
 ############################# Main classes #############################
 
+def enemy_factions(unit):
+    '''Factions at war with the one of unit.'''
+    return tuple(f for f in (Faction.ACADEMY, Faction.RENEGADES) if f != unit.faction)
+
+
 class Critic:
 
     def __init__(self, strategy):
@@ -14,6 +21,7 @@ class Critic:
         self._me        = None
         self._world     = None
         self._game      = None
+        self._constants = None
         self.lane       = ''
         self.waypoints  = []
         self.reset()
@@ -27,64 +35,28 @@ class Critic:
     def update(self):
 
         def get_nearby_allies():
-            t = []
-            t.extend(o for o in self._world.minions if o.faction == self._me.faction)
-            t.extend(o for o in self._world.wizards if o.faction == self._me.faction \
-                and o.id != self._me.id)
-            t_near = [o for o in t if distance(self.center, (o.x, o.y)) < ALLIES_DISTANCE]
-            return t_near
+            return units.within(self.center, ALLIES_DISTANCE, ('minions', 'wizards'),
+                                (self._me.faction,), exclude=(self._me.id,))
 
         def get_nearby_enemies():
-            t = []
-            t.extend(o for o in self._world.minions if o.faction not in (self._me.faction, 2, 3))
-            t.extend(o for o in self._world.buildings if o.faction not in (self._me.faction, 2, 3))
-            t.extend(o for o in self._world.wizards if o.faction != self._me.faction)
-            t_near = [o for o in t if distance(self.center, (o.x, o.y)) < ENEMIES_DISTANCE]
-            return t_near
+            return units.within(self.center, ENEMIES_DISTANCE, ('minions', 'buildings', 'wizards'),
+                                enemy_factions(self._me))
 
         def get_nearby_trees():
-            t = [o for o in self._world.trees \
-                 if distance(self.center, (o.x, o.y)) < self._game.staff_range+o.radius]
-            return t
+            return units.within(self.center, self._constants.staff_range, ('trees',), surface=True)
 
         def get_enemy_base():
             for o in self._world.buildings:
                 if o.type == 1 and o.faction != self._me.faction:
                     return o
 
-        def closest(t):
-            d = distance(self.center, (t[0].x, t[0].y))
-            res = t[0]
-            if len(t) > 1:
-                for o in t[1:]:
-                    d_new = distance(self.center, (o.x, o.y))
-                    if d_new < d: d = d_new; res = o
-            return res
-
-        def injured_list(t):
-            return [o for o in t if o.life < o.max_life*ENEMY_INJURED_HP_COEF]
-
-        def weak_list(t):
-            return [o for o in t if o.life < o.max_life*ENEMY_WEAK_HP_COEF]
-
-        def too_close_list(t):
-            return [o for o in t if distance(self.center, (o.x, o.y)) < FIGHTER_TOO_CLOSE_DISTANCE]
-
-        def engage_dist_list(t):
-            return [o for o in t if distance(self.center, (o.x, o.y)) < self.engage_dist]
-
-        def wizards_list(t):
-            return [o for o in t if o in self._world.wizards]
-
-        def buildings_list(t):
-            return [o for o in t if o in self._world.buildings]
-
         def is_near_enemy_base():
             if distance(self.center, (3600, 400)) < 800: return True
             else: return False
 
 
 
+        units = self.strategy.units
         self.update_waypoints()
 
         ## reset if dead
@@ -111,31 +83,8 @@ class Critic:
                 else:
                     self.waypoint_idx = self.waypoints.index(wp)
 
-        ## if we have bad guys around - pick one to fight!
-        if self.enemies_near:
-
-            weak_wizards        = wizards_list(weak_list(self.enemies_near))
-            weak_buildings      = buildings_list(weak_list(self.enemies_near))
-            close_enemies       = too_close_list(self.enemies_near)
-            close_wizards       = wizards_list(close_enemies)
-            engaging_wizards    = wizards_list(engage_dist_list(self.enemies_near))
-            injured_enemies     = injured_list(self.enemies_near)
-            injured_wizards     = wizards_list(injured_enemies)
-
-            ## priorities
-            if   weak_wizards:      target = closest(weak_wizards)
-            elif close_wizards:     target = closest(close_wizards)
-            elif close_enemies:     target = closest(close_enemies)
-            elif self.trees_near:   target = closest(self.trees_near)
-            # elif engaging_wizards:  target = closest(engaging_wizards)
-            elif weak_buildings:    target = closest(weak_buildings)
-            elif injured_wizards:   target = closest(injured_wizards)
-            elif injured_enemies:   target = closest(injured_enemies)
-            else:                   target = closest(self.enemies_near)
-
-        elif self.trees_near:       target = closest(self.trees_near)
-        else:                       target = None
-            
+        ## if we have bad guys or trees around - pick one to fight!
+        target                  = self.choose_target(self.enemies_near, self.trees_near)
         self.actor.target       = target
 
         if not target:
@@ -156,6 +105,34 @@ class Critic:
             self.actor.state        = 'traveller'
             self.actor.destination  = self.waypoints[self.waypoint_idx]
 
+    def choose_target(self, enemies, trees):
+        '''Returns the closest candidate of the first priority a candidate has, None if there are
+        none. Candidates are scored at once.'''
+        candidates = enemies+trees
+        if not candidates: return None
+        kind        = np.array([o.kind for o in candidates])
+        x, y, life, max_life = np.array([(o.x, o.y, o.life, o.max_life) for o in candidates], dtype=float).T
+        d           = distances(self.center, np.column_stack((x, y)))[0]
+        wizard      = kind == 'wizards'
+        tree        = kind == 'trees'
+        enemy       = ~tree
+        weak        = life < max_life*ENEMY_WEAK_HP_COEF
+        injured     = life < max_life*ENEMY_INJURED_HP_COEF
+        close       = d < FIGHTER_TOO_CLOSE_DISTANCE
+        ## priorities
+        tiers = np.array((
+            wizard & weak,              # weak wizards
+            wizard & close,             # close wizards
+            enemy & close,              # close enemies
+            tree,                       # trees in the way
+            # wizard & (d < self.engage_dist), # engaging wizards
+            (kind == 'buildings') & weak, # weak buildings
+            wizard & injured,           # injured wizards
+            enemy & injured,            # injured enemies
+            enemy))                     # any enemy
+        tier = tiers.argmax(axis=0) # first priority of each candidate
+        return candidates[np.lexsort((d, tier))[0]]
+
     def update_waypoints(self):
         if   self._me.id in (1, 2, 6, 7):   self.lane = 'top'
         elif self._me.id in (3, 8):         self.lane = 'mid'
@@ -174,6 +151,7 @@ class Actor:
         self._me            = None
         self._world         = None
         self._game          = None
+        self._constants     = None
         self.state          = 'traveller'
         self.reset()
 
@@ -185,10 +163,12 @@ class Actor:
 
     def update(self):
 
+        c                   = self._constants
         self.critic         = self.strategy.critic
         self.center         = (self._me.x, self._me.y)
-        self.melee_d        = self._game.staff_range
+        self.melee_d        = c.staff_range
         self.range_d        = self._me.cast_range
+        missile_reach       = self.range_d-c.magic_missile_radius   # to the target edge
         self.tgt_pos        = None
         turn                = 0.0
         cast_angle          = 0.0
@@ -208,14 +188,12 @@ class Actor:
             turn            = self.tgt_a_rel
 
             ## attack if we can
-            if abs(self.tgt_a_rel) <= self._game.staff_sector/2:
-                range_cooldown = self._me.remaining_cooldown_ticks_by_action[2]
+            if abs(self.tgt_a_rel) <= c.half_staff_sector:
+                range_cooldown = self._me.remaining_cooldown_ticks_by_action[ActionType.MAGIC_MISSILE]
                 ## range
-                if self.tgt_d <= (self.range_d+self.target.radius-self._game.magic_missile_radius) \
-                and not range_cooldown:
+                if self.tgt_d <= missile_reach+self.target.radius and not range_cooldown:
                     cast_angle          = self.tgt_a_rel
-                    min_cast_distance   = self.tgt_d - self.target.radius + \
-                                          self._game.magic_missile_radius
+                    min_cast_distance   = self.tgt_d - self.target.radius + c.magic_missile_radius
                     action              = ActionType.MAGIC_MISSILE
                 ## melee
                 elif self.tgt_d <= self.melee_d+self.target.radius:
@@ -260,10 +238,7 @@ class Actor:
             return (x, y)
 
         def is_bad_wiz_near():
-            for creep in self.critic.enemies_near:
-                if creep in self._world.wizards and creep.faction != self._me.faction:
-                    return True
-            return False
+            return any(o.kind == 'wizards' for o in self.critic.enemies_near)
 
         flee_wp_idx         = self.critic.waypoint_idx-2
         if flee_wp_idx < 0: flee_wp_idx = 0
@@ -285,13 +260,13 @@ class Actor:
             else:                           self.destination = self.tgt_pos
 
         ## engage - weak wiz, good shape
-        elif self.target in self._world.wizards \
+        elif self.target.kind == 'wizards' \
         and  (self.target.life < self.target.max_life*ENEMY_WEAK_HP_COEF) \
         and  (self._me.life > FIGHTER_HP_CAUCIOUS):
             self.destination = self.tgt_pos
 
         ## engage - winning a wiz fight, but do not move too close
-        elif self.target in self._world.wizards \
+        elif self.target.kind == 'wizards' \
         and  (self._me.life > self.target.life) \
         and  (self.tgt_d > engage_dist):
             self.destination = steer_point
@@ -4,6 +4,8 @@ from model.MinionType import MinionType
 
 
 class Minion(LivingUnit):
+    kind = 'minions' # World list of the unit
+
     def __init__(self, id, x, y, speed_x, speed_y, angle, faction: (None, Faction), radius, life, max_life, statuses,
                  type: (None, MinionType), vision_range, damage, cooldown_ticks, remaining_action_cooldown_ticks):
         LivingUnit.__init__(self, id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life, statuses)
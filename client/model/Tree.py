@@ -3,5 +3,7 @@ from model.LivingUnit import LivingUnit
 
 
 class Tree(LivingUnit):
+    kind = 'trees' # World list of the unit
+
     def __init__(self, id, x, y, speed_x, speed_y, angle, faction: (None, Faction), radius, life, max_life, statuses):
         LivingUnit.__init__(self, id, x, y, speed_x, speed_y, angle, faction, radius, life, max_life, statuses)
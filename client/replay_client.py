@@ -0,0 +1,51 @@
+import mmap
+import struct
+import sys
+import time
+
+from RemoteProcessClient import RemoteProcessClient
+
+############################# Replay client #############################
+
+class ReplayClient(RemoteProcessClient):
+    '''Serves a stream recorded with RemoteProcessClient.start_recording from a memory-mapped file.
+    Sent messages are discarded.'''
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.init_buffers()
+        self.receive_view.release()
+        self.receive_buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.receive_view = memoryview(self.receive_buffer)
+        self.receive_limit = len(self.receive_buffer)
+        with open(path + '.idx', 'rb') as f: index = f.read()
+        count = len(index)//RemoteProcessClient.LONG_SIZE_BYTES
+        self.tick_offsets = struct.unpack(RemoteProcessClient.BYTE_ORDER_FORMAT_STRING + str(count) + 'q', index)
+
+    def seek_tick(self, tick):
+        '''Next read_player_context_message returns the tick-th recorded player context.
+        Trees the server skipped in that tick are taken from the last decoded one.'''
+        self.receive_offset = self.tick_offsets[tick]
+
+    def fill_receive_buffer(self, byte_count):
+        raise IOError("Can't read %s bytes from input stream." % str(byte_count))
+
+    def flush(self):
+        del self.send_buffer[:]
+
+    def close(self):
+        self.receive_view.release()
+        self.receive_buffer.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    ## usage: replay_client.py <recording>; runs the strategy over all recorded ticks
+    from Runner import Runner
+    client  = ReplayClient(sys.argv[1])
+    ## the last indexed message is game over
+    ticks   = len(client.tick_offsets)-1
+    start   = time.perf_counter()
+    Runner(client).run()
+    elapsed = time.perf_counter()-start
+    print('{} ticks in {:.3f} s, {:.1f} ticks/s'.format(ticks, elapsed, ticks/elapsed))
@@ -0,0 +1,58 @@
+from model.Bonus import Bonus
+from model.BonusType import BonusType
+from model.Building import Building
+from model.BuildingType import BuildingType
+from model.Faction import Faction
+from model.Message import Message
+from model.Minion import Minion
+from model.MinionType import MinionType
+from model.Player import Player
+from model.Projectile import Projectile
+from model.ProjectileType import ProjectileType
+from model.SkillType import SkillType
+from model.Status import Status
+from model.StatusType import StatusType
+from model.Tree import Tree
+from model.Wizard import Wizard
+from model.World import World
+
+############################# Sample units #############################
+
+def sample_statuses(rnd):
+    return [Status(rnd.randint(0, 1000), StatusType.BURNING, 1, 1, rnd.randint(1, 100)) \
+            for _ in range(rnd.randint(0, 1))]
+
+def sample_tree(rnd, id):
+    return Tree(id, rnd.uniform(0, 4000), rnd.uniform(0, 4000), 0.0, 0.0, 0.0, Faction.OTHER,
+                rnd.uniform(20, 50), 12, 12, [])
+
+def sample_minion(rnd, id):
+    return Minion(id, rnd.uniform(0, 4000), rnd.uniform(0, 4000), rnd.random(), rnd.random(),
+                  rnd.uniform(-3, 3), rnd.choice((Faction.ACADEMY, Faction.RENEGADES)), 25.0,
+                  rnd.randint(1, 100), 100, sample_statuses(rnd), MinionType.ORC_WOODCUTTER, 400.0, 12, 60, 0)
+
+def sample_building(rnd, id):
+    return Building(id, rnd.uniform(0, 4000), rnd.uniform(0, 4000), 0.0, 0.0, 0.0, Faction.RENEGADES, 50.0,
+                    1000, 1000, [], BuildingType.GUARDIAN_TOWER, 600.0, 500.0, 36, 240, 0)
+
+def sample_projectile(rnd, id):
+    return Projectile(id, rnd.uniform(0, 4000), rnd.uniform(0, 4000), 40.0, 0.0, 0.0, Faction.ACADEMY, 10.0,
+                      ProjectileType.MAGIC_MISSILE, 1, 1)
+
+def sample_wizard(rnd, id):
+    return Wizard(id, rnd.uniform(0, 4000), rnd.uniform(0, 4000), rnd.random(), rnd.random(), rnd.uniform(-3, 3),
+                  Faction.ACADEMY if id <= 5 else Faction.RENEGADES, 35.0, rnd.randint(1, 100), 100,
+                  sample_statuses(rnd), id, id == 1, 100, 100, 600.0, 500.0, 0, 1,
+                  [SkillType.RANGE_BONUS_PASSIVE_1], 0, [0, 0, rnd.randint(0, 60), 0, 0, 0, 0], id == 1,
+                  [Message(None, None, b'')])
+
+def sample_world(rnd, minions=40, trees=150):
+    return World(0, 20000, 4000.0, 4000.0,
+                 [Player(id, id == 1, 'player %d' % id, False, rnd.randint(0, 1000),
+                         Faction.ACADEMY if id <= 5 else Faction.RENEGADES) for id in range(1, 11)],
+                 [sample_wizard(rnd, id) for id in range(1, 11)],
+                 [sample_minion(rnd, 100+i) for i in range(minions)],
+                 [sample_projectile(rnd, 900+i) for i in range(5)],
+                 [Bonus(990, 1200.0, 1200.0, 0.0, 0.0, 0.0, Faction.NEUTRAL, 20.0, BonusType.HASTE)],
+                 [sample_building(rnd, 1000+i) for i in range(14)],
+                 [sample_tree(rnd, 2000+i) for i in range(trees)])
@@ -0,0 +1,40 @@
+import inspect
+import model.Bonus
+import model.Building
+import model.CircularUnit
+import model.Game
+import model.LivingUnit
+import model.Message
+import model.Minion
+import model.Projectile
+import model.Status
+import model.Tree
+import model.Unit
+import model.Wizard
+
+############################# Slotted model #############################
+
+def slotted(cls, base=object):
+    '''Returns a copy of model class cls deriving from base, with __slots__ instead of __dict__.
+    Constructor and methods are shared with cls; each constructor argument is stored as is.'''
+    fields = [p for p in inspect.signature(cls.__init__).parameters if p != 'self']
+    if base is not object:
+        inherited = inspect.signature(base.__init__).parameters
+        fields = [p for p in fields if p not in inherited]
+    namespace = {k: v for k, v in cls.__dict__.items() if k not in ('__dict__', '__weakref__')}
+    namespace['__slots__']  = tuple(fields)
+    namespace['__module__'] = __name__
+    return type(cls.__name__, (base,), namespace)
+
+Unit            = slotted(model.Unit.Unit)
+CircularUnit    = slotted(model.CircularUnit.CircularUnit, Unit)
+LivingUnit      = slotted(model.LivingUnit.LivingUnit, CircularUnit)
+Bonus           = slotted(model.Bonus.Bonus, CircularUnit)
+Projectile      = slotted(model.Projectile.Projectile, CircularUnit)
+Building        = slotted(model.Building.Building, LivingUnit)
+Minion          = slotted(model.Minion.Minion, LivingUnit)
+Tree            = slotted(model.Tree.Tree, LivingUnit)
+Wizard          = slotted(model.Wizard.Wizard, LivingUnit)
+Message         = slotted(model.Message.Message)
+Status          = slotted(model.Status.Status)
+Game            = slotted(model.Game.Game)
@@ -0,0 +1,89 @@
+from utilities import *
+from config import *
+
+############################# Spatial hash #############################
+
+class SpatialHash:
+    '''Units of the world in square cells of cell_size, rebuilt once per tick. A query only visits
+    cells its circle covers, so it costs the number of units around, not on the map.
+    Results are in the order of kinds, then in world order.'''
+
+    KINDS = ('minions', 'buildings', 'wizards', 'trees')
+
+    def __init__(self, cell_size):
+        self.cell_size  = cell_size
+        self.cells      = {}    # (cx, cy) -> [(index, kind, unit)]
+        self.max_radius = 0.0   # of all units, cells around are visited for boundary distances
+        self.bounds     = None  # min cx, min cy, max cx, max cy
+
+    def update(self, world):
+        cs, cells, max_radius, index = self.cell_size, {}, 0.0, 0
+        for kind in self.KINDS:
+            for o in getattr(world, kind):
+                cell = (int(o.x//cs), int(o.y//cs))
+                if cell in cells: cells[cell].append((index, kind, o))
+                else: cells[cell] = [(index, kind, o)]
+                if o.radius > max_radius: max_radius = o.radius
+                index += 1
+        self.cells, self.max_radius = cells, max_radius
+        if cells:
+            xs, ys = [c[0] for c in cells], [c[1] for c in cells]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.bounds = None
+
+    def within(self, center, radius, kinds=None, factions=None, exclude=(), surface=False):
+        '''Units closer than radius to center; with surface, closer than radius plus their own.
+        kinds and factions: allowed ones, None for all; exclude: unit ids.'''
+        cs = self.cell_size
+        reach = radius+self.max_radius if surface else radius
+        x0, x1 = int((center[0]-reach)//cs), int((center[0]+reach)//cs)
+        y0, y1 = int((center[1]-reach)//cs), int((center[1]+reach)//cs)
+        if self.bounds:
+            x0, y0 = max(x0, self.bounds[0]), max(y0, self.bounds[1])
+            x1, y1 = min(x1, self.bounds[2]), min(y1, self.bounds[3])
+        found = []
+        for cx in range(x0, x1+1):
+            for cy in range(y0, y1+1):
+                for entry in self.cells.get((cx, cy), ()):
+                    _, kind, o = entry
+                    if (kinds is not None and kind not in kinds) \
+                    or (factions is not None and o.faction not in factions) \
+                    or o.id in exclude: continue
+                    if distance(center, (o.x, o.y)) < (radius+o.radius if surface else radius):
+                        found.append(entry)
+        return self.ordered(found, kinds)
+
+    def nearest(self, center, k, kinds=None, factions=None, exclude=()):
+        '''Up to k units with the closest centers, nearest first. Rings of cells around the cell of
+        center are visited until no unit further out can be closer than the k-th found.'''
+        if not self.bounds: return []
+        cs = self.cell_size
+        cx, cy = int(center[0]//cs), int(center[1]//cs)
+        last = max(cx-self.bounds[0], cy-self.bounds[1], self.bounds[2]-cx, self.bounds[3]-cy)
+        found = []
+        for ring in range(max(last, 0)+1):
+            if ring == 0:
+                cells = [(cx, cy)]
+            else:
+                cells = [(x, y) for x in range(cx-ring, cx+ring+1) for y in (cy-ring, cy+ring)]
+                cells.extend((x, y) for x in (cx-ring, cx+ring) for y in range(cy-ring+1, cy+ring))
+            for cell in cells:
+                for index, kind, o in self.cells.get(cell, ()):
+                    if (kinds is not None and kind not in kinds) \
+                    or (factions is not None and o.faction not in factions) \
+                    or o.id in exclude: continue
+                    found.append((distance(center, (o.x, o.y)), index, o))
+            ## units in further rings are at least ring cells away
+            if len(found) >= k:
+                found.sort(key=lambda f: f[:2])
+                del found[k:]
+                if found[-1][0] <= ring*cs: break
+        found.sort(key=lambda f: f[:2])
+        return [o for _, _, o in found[:k]]
+
+    @staticmethod
+    def ordered(entries, kinds):
+        if kinds is None: entries.sort()
+        else: entries.sort(key=lambda e: (kinds.index(e[1]), e[0]))
+        return [o for _, _, o in entries]
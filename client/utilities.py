@@ -1,5 +1,7 @@
 import math
-from queue import PriorityQueue
+import numpy as np
+from functools import reduce
+from heapq import heapify, heappop, heappush
 from config import *
 
 ############################# Utilities #############################
@@ -13,65 +15,421 @@ def rel_angle(a1, a2):
     elif a_rel >  math.pi: a_rel =  math.pi-a_rel
     return a_rel
 
-def search_path(grid, nodes, start, goal):
-    '''grid: weighted grid with walls. Returns shortest path.'''
+def octile(p1, p2):
+    '''Returns cost of the shortest move between nodes on open ground.'''
+    dx, dy = abs(p1[0]-p2[0]), abs(p1[1]-p2[1])
+    if dx > dy: dx, dy = dy, dx
+    return dx*MOVE_COST_DIAG+(dy-dx)*MOVE_COST
+
+############################# Batch geometry #############################
+
+## points and units are arrays of (x, y) rows, or a single (x, y); results have a row per point
+
+def positions(units):
+    '''Returns centers of units as an array of (x, y) rows.'''
+    return np.array([(o.x, o.y) for o in units], dtype=float).reshape((-1, 2))
+
+def distances(points, units):
+    '''Returns distance() between each point and each unit, to the bit: float_power squares as the
+    ** of Python floats does, which may differ from x*x in the last bit.'''
+    p, u = np.reshape(points, (-1, 2)), np.reshape(units, (-1, 2))
+    return np.sqrt(np.float_power(p[:, None, 0]-u[None, :, 0], 2)+np.float_power(p[:, None, 1]-u[None, :, 1], 2))
+
+def rel_angles(a1, a2):
+    '''Returns rel_angle() of arrays a1 and a2, broadcast against each other.'''
+    a_rel = np.subtract(a2, a1)
+    return np.where(a_rel < -math.pi, -math.pi-a_rel, np.where(a_rel > math.pi, math.pi-a_rel, a_rel))
+
+def angles_to(points, angles, units):
+    '''Returns angles to each unit relative to the angle faced at each point. NumPy arctan2 may
+    differ from math.atan2 in the last bit.'''
+    p, u = np.reshape(points, (-1, 2)), np.reshape(units, (-1, 2))
+    a = np.arctan2(u[None, :, 1]-p[:, None, 1], u[None, :, 0]-p[:, None, 0])
+    return rel_angles(np.reshape(angles, (-1, 1)), a)
+
+def in_sector(points, angles, units, half_sector):
+    '''True where a unit is within half_sector of the angle faced at a point, half of staff_sector
+    for any action.'''
+    return np.abs(angles_to(points, angles, units)) <= half_sector
+
+def in_range(points, units, ranges, radii=0):
+    '''True where the edge of a unit is within range of a point, e.g. cast_range or staff_range.
+    ranges are per point, radii per unit, either may be a number.'''
+    return distances(points, units) <= np.reshape(ranges, (-1, 1))+np.reshape(radii, (1, -1))
+
+JUMP_DIRECTIONS = tuple((x, y) for x in range(-1, 2) for y in range(-1, 2) if x != 0 or y != 0)
+
+class SearchSpace:
+    '''Buffers for search_path on grids of one shape. Nodes are flat indices into the grid padded
+    with a border of closed nodes, so neighbours need no bounds checks. Index order matches (x, y)
+    tuple order, so ties in the frontier break as they did with tuple nodes.'''
+
+    spaces = {} # shape -> SearchSpace
+
+    @classmethod
+    def get(cls, shape):
+        space = cls.spaces.get(shape)
+        if space is None: space = cls.spaces[shape] = cls(shape)
+        return space
+
+    def __init__(self, shape):
+        self.shape      = shape
+        self.stride     = shape[1]+2
+        self.size       = (shape[0]+2)*self.stride
+        ## neighbour index offsets with move costs, in the order neighbours were generated
+        self.offsets    = tuple((x*self.stride+y, MOVE_COST if x == 0 or y == 0 else MOVE_COST_DIAG) \
+                                for x in range(-1, 2) for y in range(-1, 2) if x != 0 or y != 0)
+        self.xs, self.ys = (a.ravel() for a in np.indices((shape[0]+2, self.stride))-1)
+        self.coords     = list(zip(self.xs.tolist(), self.ys.tolist()))
+        self.border     = np.ones((shape[0]+2, self.stride), dtype=bool)
+        self.border[1:-1, 1:-1] = False
+        self.cost       = np.zeros((shape[0]+2, self.stride), dtype=np.int64)
+        self.closed     = np.empty_like(self.border)
+
+    def index(self, node):
+        return (node[0]+1)*self.stride+node[1]+1
+
+    def node(self, index):
+        return self.coords[index]
+
+    def heuristic(self, goal):
+        '''Returns octile costs to goal of all nodes, by index.'''
+        dx, dy = np.abs(self.xs-goal[0]), np.abs(self.ys-goal[1])
+        d_min = np.minimum(dx, dy)
+        return (d_min*MOVE_COST_DIAG+(dx+dy-2*d_min)*MOVE_COST).tolist()
+
+    def pad(self, costs):
+        '''Returns node costs with walls as -1 padded with the border, as lists by index: costs of
+        entering nodes, 0 if closed, and closed flags of walls and border.'''
+        padded = np.full((self.shape[0]+2, self.stride), -1, dtype=int)
+        padded[1:-1, 1:-1] = costs
+        padded = padded.ravel()
+        return np.maximum(padded, 0).tolist(), (padded < 0).tolist()
+
+    def search_full(self, nodes, walls, start, goal):
+        '''Search of the whole grid: search_jump_points if PATH_JUMP_POINTS is set and start is on the
+        grid, else search.'''
+        if PATH_JUMP_POINTS and 0 <= start[0] < self.shape[0] and 0 <= start[1] < self.shape[1]:
+            return self.search_jump_points(nodes, walls, start, goal)
+        return self.search(nodes, walls, start, goal)
 
-    def neighbors(node):
-        '''Returns a list of node neighbours.'''
-        res = [(node[0]+x, node[1]+y) for x in range(-1, 2) for y in range(-1,2) \
-               if  0 <= (node[0]+x) < nodes.shape[0] \
-               and 0 <= (node[1]+y) < nodes.shape[1] \
-               and (x != 0 or y != 0)]
-        res = [node for node in res if node not in grid.walls]
-        return res
-
-    def cost(node_from, node_to):
-        '''Assumes nodes are adjacent, including diagonal.'''
-        move_cost = 0
-        if node_from[0] == node_to[0] or node_from[1] == node_to[1]:
-            move_cost = MOVE_COST
+    def search(self, nodes, walls, start, goal):
+        '''walls: boolean mask aligned with nodes.'''
+        if not (0 <= goal[0] < self.shape[0] and 0 <= goal[1] < self.shape[1]): return []
+        ## initialize; NumPy prepares the per-call arrays, the loop runs over lists
+        self.cost[1:-1, 1:-1] = nodes
+        cost = self.cost.ravel().tolist()
+        np.copyto(self.closed, self.border)
+        self.closed[1:-1, 1:-1] = walls
+        closed = self.closed.ravel().tolist()
+        h = self.heuristic(goal)
+        start_i, goal_i = self.index(start), self.index(goal)
+        g = [math.inf]*self.size
+        parent = [0]*self.size
+        closed[start_i] = False
+        g[start_i] = 0
+        frontier = [(0, start_i)]
+        offsets = self.offsets
+        ## search
+        while frontier:
+            current = heappop(frontier)[1]
+            if closed[current]: continue # skip explored nodes
+            if current == goal_i: # path found
+                path = []
+                while current != start_i:
+                    path.append(self.node(current))
+                    current = parent[current]
+                path.reverse()
+                return path
+            closed[current] = True # mark node as explored
+            g_current = g[current]
+            for offset, move_cost in offsets:
+                next_node = current+offset
+                if closed[next_node]: continue # skip explored nodes, walls and border
+                new_cost = g_current+move_cost+cost[next_node]
+                if new_cost < g[next_node]:
+                    g[next_node] = new_cost
+                    heappush(frontier, (new_cost+h[next_node], next_node))
+                    parent[next_node] = current
+        return [] # there is no path
+
+    def search_jump_points(self, nodes, walls, start, goal):
+        '''Jump point search, with paths of the same cost as search. Nodes with a cost and their
+        neighbours are special: jumps stop at them and they are expanded to all neighbours. Elsewhere
+        moves cost the same everywhere, so only jump points where the way turns around walls are
+        expanded. Diagonal moves between walls are allowed, as in search.'''
+        if not (0 <= goal[0] < self.shape[0] and 0 <= goal[1] < self.shape[1]): return []
+        ## initialize
+        self.cost[1:-1, 1:-1] = nodes
+        np.copyto(self.closed, self.border)
+        self.closed[1:-1, 1:-1] = walls
+        blocked = self.closed
+        costed = (self.cost != 0) & ~blocked
+        near = costed.copy()
+        near[1:] |= costed[:-1]
+        near[:-1] |= costed[1:]
+        special = near.copy()
+        special[:, 1:] |= near[:, :-1]
+        special[:, :-1] |= near[:, 1:]
+        special[start[0]+1, start[1]+1] = special[goal[0]+1, goal[1]+1] = True
+        ## straight jumps of each direction, as steps to the jump point, 0 if a wall comes first
+        straight = {}
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            axis = 0 if dx else 1
+            side = np.roll(blocked, 1, axis=1-axis), np.roll(blocked, -1, axis=1-axis)
+            forced = reduce(np.logical_or, (b & ~np.roll(b, -(dx or dy), axis=axis) for b in side))
+            straight[(dx, dy)] = self.steps_to_stop(blocked | special | forced, blocked, axis, dx+dy).ravel().tolist()
+        cost, blocked, special = self.cost.ravel().tolist(), blocked.ravel().tolist(), special.ravel().tolist()
+        h = self.heuristic(goal)
+        S, coords = self.stride, self.coords
+        start_i, goal_i = self.index(start), self.index(goal)
+        g = [math.inf]*self.size
+        parent = [0]*self.size
+        explored = [False]*self.size
+        g[start_i] = 0
+        frontier = [(0, start_i)]
+
+        def jump(node, dx, dy):
+            '''Returns next jump point from node in direction dx, dy and number of steps to it.'''
+            if not (dx and dy):
+                steps = straight[(dx, dy)][node]
+                return (node+steps*(dx*S+dy), steps) if steps else (None, 0)
+            ## diagonal: step by step
+            d, steps = dx*S+dy, 0
+            jump_x, jump_y = straight[(dx, 0)], straight[(0, dy)]
+            while True:
+                node += d
+                steps += 1
+                if blocked[node]: return None, 0
+                if special[node]: return node, steps
+                ## forced neighbours, then jump points straight ahead
+                if (blocked[node-dx*S] and not blocked[node-dx*S+dy]) \
+                or (blocked[node-dy] and not blocked[node+dx*S-dy]) \
+                or jump_x[node] or jump_y[node]: return node, steps
+
+        ## search
+        while frontier:
+            current = heappop(frontier)[1]
+            if explored[current]: continue
+            if current == goal_i: # path found, fill in nodes between jump points
+                path = []
+                while current != start_i:
+                    x, y = coords[current]
+                    px, py = coords[parent[current]]
+                    dx, dy = (px > x)-(px < x), (py > y)-(py < y)
+                    while (x, y) != (px, py):
+                        path.append((x, y))
+                        x, y = x+dx, y+dy
+                    current = parent[current]
+                path.reverse()
+                return path
+            explored[current] = True
+            if special[current]:
+                directions = JUMP_DIRECTIONS
+            else: # natural and forced neighbours only
+                x, y = coords[current]
+                px, py = coords[parent[current]]
+                dx, dy = (x > px)-(x < px), (y > py)-(y < py)
+                if dx and dy:
+                    directions = [(dx, 0), (0, dy), (dx, dy)]
+                    if blocked[current-dx*S]: directions.append((-dx, dy))
+                    if blocked[current-dy]: directions.append((dx, -dy))
+                elif dx:
+                    directions = [(dx, 0)]
+                    if blocked[current+1]: directions.append((dx, 1))
+                    if blocked[current-1]: directions.append((dx, -1))
+                else:
+                    directions = [(0, dy)]
+                    if blocked[current+S]: directions.append((1, dy))
+                    if blocked[current-S]: directions.append((-1, dy))
+            for dx, dy in directions:
+                next_node = current+dx*S+dy
+                if blocked[next_node]: continue
+                if special[next_node]: steps = 1 # a step as by search
+                else: next_node, steps = jump(current, dx, dy)
+                if next_node is None or explored[next_node]: continue
+                new_cost = g[current]+steps*(MOVE_COST_DIAG if dx and dy else MOVE_COST)+cost[next_node]
+                if new_cost < g[next_node]:
+                    g[next_node] = new_cost
+                    parent[next_node] = current
+                    heappush(frontier, (new_cost+h[next_node], next_node))
+        return [] # there is no path
+
+    @staticmethod
+    def steps_to_stop(stop, blocked, axis, step):
+        '''Returns steps from each node along axis in direction step (1 or -1) to the nearest stop
+        node, or 0 if that node is blocked. The border has to be blocked.'''
+        if axis: stop, blocked = stop.T, blocked.T
+        if step < 0: stop, blocked = stop[::-1], blocked[::-1]
+        rows = np.arange(stop.shape[0])[:, None]
+        first = np.where(stop, rows, stop.shape[0]-1)
+        first = np.minimum.accumulate(first[::-1], axis=0)[::-1] # nearest stop at or after each row
+        steps = np.zeros(stop.shape, dtype=int)
+        steps[:-1] = np.where(np.take_along_axis(blocked, first[1:], axis=0), 0, first[1:]-rows[:-1])
+        if step < 0: steps = steps[::-1]
+        return steps.T if axis else steps
+
+
+class IncrementalSearch:
+    '''D* Lite over the padded grid of SearchSpace. Searches backwards from the goal and keeps g, rhs
+    and the frontier between calls: while the goal stays, only nodes next to changed costs or walls
+    are repaired, and a start moving along the path costs almost nothing. Searches from scratch when
+    the goal or grid shape changes, or too many nodes changed.'''
+
+    def __init__(self):
+        self.space  = None
+        self.goal   = None
+
+    def search(self, grid, start, goal):
+        '''Same contract as search_path.'''
+        nodes, walls = grid.nodes, grid.walls.mask
+        space = SearchSpace.get(nodes.shape)
+        if not (0 <= goal[0] < space.shape[0] and 0 <= goal[1] < space.shape[1]): return []
+        if not (0 <= start[0] < space.shape[0] and 0 <= start[1] < space.shape[1]):
+            return space.search_full(nodes, walls, start, goal)
+        ## padded costs and blocked nodes (walls and border) of this call
+        cost = space.cost.copy()
+        cost[1:-1, 1:-1] = nodes
+        blocked = space.border.copy()
+        blocked[1:-1, 1:-1] = walls
+        cost, blocked = cost.ravel(), blocked.ravel()
+        start_i = space.index(start)
+        if space is not self.space or goal != self.goal:
+            self.initialize(space, goal, start_i, cost, blocked)
         else:
-            move_cost = MOVE_COST_DIAG
-        return move_cost+nodes[node_to]
-
-    def manhattan_dist(p1, p2):
-        '''Returns manhattan distance cost with diagonal moves.'''
-        dx, dy = abs(p1[0]-p2[0]), abs(p1[1]-p2[1])
-        if dx > dy: dx, dy = dy, dx
-        return dx*MOVE_COST_DIAG+(dy-dx)*MOVE_COST
-
-    def get_path(goal):
-        '''Returns path.'''
-        current = goal
-        path = []
-        while current != start:
-            path.append(current)
-            current = came_from[current]
-        path.reverse()
+            changed = np.flatnonzero((cost != self.cost_array) | (blocked != self.blocked_array)).tolist()
+            ## edges into a node with infinite g stay infinite whatever its cost
+            g = self.g
+            repair = [v for v in changed if g[v] != math.inf]
+            if len(repair) > PATH_REPAIR_MAX_NODES:
+                self.initialize(space, goal, start_i, cost, blocked)
+            else:
+                self.km += self.h(self.start, start)
+                self.start, self.start_node = start_i, start
+                self.cost_array, self.blocked_array = cost, blocked
+                for v in changed: self.cost[v], self.blocked[v] = int(cost[v]), bool(blocked[v])
+                ## costs of edges into v changed
+                for v in repair:
+                    for offset, _ in space.offsets:
+                        if not self.border[v+offset]: self.update_node(v+offset)
+                self.compute()
+        return self.get_path()
+
+    def initialize(self, space, goal, start_i, cost, blocked):
+        self.space, self.goal       = space, goal
+        self.goal_i, self.start     = space.index(goal), start_i
+        self.start_node             = space.node(start_i)
+        self.cost_array             = cost
+        self.blocked_array          = blocked
+        self.cost, self.blocked     = cost.tolist(), blocked.tolist()
+        self.border                 = space.border.ravel().tolist()
+        self.g                      = [math.inf]*space.size
+        self.rhs                    = [math.inf]*space.size
+        self.queued                 = [None]*space.size # current frontier key by node, others are stale
+        self.frontier               = []
+        self.km                     = 0
+        self.rhs[self.goal_i]       = 0
+        self.push(self.goal_i)
+        ## backward A* leaves the state D* Lite would: expanded nodes consistent, frontier nodes
+        ## with rhs from expanded neighbours, at a fraction of the cost of update_node
+        g, rhs, queued, frontier, border = self.g, self.rhs, self.queued, self.frontier, self.border
+        cost, blocked, h, offsets = self.cost, self.blocked, space.heuristic(self.start_node), space.offsets
+        while frontier:
+            key, node = frontier[0]
+            if queued[node] != key: # stale
+                heappop(frontier)
+                continue
+            if key >= self.key(start_i) and rhs[start_i] == g[start_i]: break
+            heappop(frontier)
+            queued[node] = None
+            g_node = g[node] = rhs[node]
+            if blocked[node]: continue # can't be entered
+            g_node += cost[node]
+            for offset, move_cost in offsets:
+                prev_node = node+offset
+                if border[prev_node] or g[prev_node] != math.inf: continue
+                new_cost = g_node+move_cost
+                if new_cost < rhs[prev_node]:
+                    rhs[prev_node] = new_cost
+                    key = queued[prev_node] = (new_cost+h[prev_node], new_cost)
+                    heappush(frontier, (key, prev_node))
+
+    def h(self, node, p):
+        '''Heuristic cost between node index and (x, y) p.'''
+        return octile(self.space.coords[node], p)
+
+    def key(self, node):
+        k = min(self.g[node], self.rhs[node])
+        return (k+self.h(node, self.start_node)+self.km, k)
+
+    def push(self, node):
+        key = self.queued[node] = self.key(node)
+        heappush(self.frontier, (key, node))
+
+    def update_node(self, node):
+        if node != self.goal_i:
+            g, cost, blocked = self.g, self.cost, self.blocked
+            rhs = math.inf
+            for offset, move_cost in self.space.offsets:
+                next_node = node+offset
+                if blocked[next_node]: continue
+                c = move_cost+cost[next_node]+g[next_node]
+                if c < rhs: rhs = c
+            self.rhs[node] = rhs
+        if self.g[node] != self.rhs[node]: self.push(node)
+        else: self.queued[node] = None
+
+    def compute(self):
+        g, rhs, queued, frontier, border = self.g, self.rhs, self.queued, self.frontier, self.border
+        offsets, start = self.space.offsets, self.start
+        if len(frontier) > 4*self.space.size: # drop stale entries
+            frontier[:] = [(key, node) for key, node in frontier if queued[node] == key]
+            heapify(frontier)
+        while frontier:
+            key, node = frontier[0]
+            if queued[node] != key: # stale
+                heappop(frontier)
+                continue
+            if key >= self.key(start) and rhs[start] == g[start]: break
+            heappop(frontier)
+            new_key = self.key(node)
+            if key < new_key:
+                self.push(node)
+                continue
+            queued[node] = None
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+            else:
+                g[node] = math.inf
+                self.update_node(node)
+            for offset, _ in offsets:
+                if not border[node+offset]: self.update_node(node+offset)
+
+    def get_path(self):
+        '''Follows the cheapest successors from start to goal.'''
+        g, cost, blocked, offsets = self.g, self.cost, self.blocked, self.space.offsets
+        node, path = self.start, []
+        if self.rhs[node] == math.inf: return [] # there is no path
+        while node != self.goal_i:
+            best, best_node = math.inf, None
+            for offset, move_cost in offsets:
+                next_node = node+offset
+                if blocked[next_node]: continue
+                c = move_cost+cost[next_node]+g[next_node]
+                if c < best: best, best_node = c, next_node
+            if best_node is None or len(path) > self.space.size: return []
+            path.append(self.space.node(best_node))
+            node = best_node
         return path
 
-    ## initialize
-    frontier = PriorityQueue()
-    came_from = {}
-    cost_so_far = {}
-    explored = {}
-    frontier.put((0, start))
-    came_from[start] = start
-    cost_so_far[start] = 0
-    ## search
-    while True:
-        while True: # pop queue until unexplored node
-            if frontier.empty(): return [] # there is no path
-            current = frontier.get()[1]
-            if current not in explored: break
-        if current == goal: # path found
-            return get_path(goal)
-        explored[current] = True # mark node as explored
-        for next_node in neighbors(current):
-            if next_node in explored: continue # skip all explored nodes
-            new_cost = cost_so_far[current] + cost(current, next_node)
-            if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
-                cost_so_far[next_node] = new_cost
-                priority = new_cost + manhattan_dist(next_node, goal)
-                frontier.put((priority, next_node))
-                came_from[next_node] = current
+def search_path(grid, nodes, start, goal):
+    '''grid: weighted grid with walls. Returns shortest path.'''
+    return SearchSpace.get(nodes.shape).search_full(nodes, grid.walls.mask, start, goal)
+
+
+class FullSearch:
+    '''Planner searching the whole grid on every call.'''
+
+    def search(self, grid, start, goal):
+        '''Same contract as search_path.'''
+        return search_path(grid, grid.nodes, start, goal)
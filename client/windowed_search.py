@@ -0,0 +1,57 @@
+import numpy as np
+from utilities import *
+from config import *
+
+############################# Windowed search #############################
+
+class WindowedSearch:
+    '''Searches with current costs only a window of PATH_WINDOW_NODES nodes around the start, toward
+    the node where a global route leaves the window. The route is searched over the static layer of
+    the grid (trees and buildings) again when the goal or the static layer changes, or the start has
+    strayed out of its reach. The whole grid is searched when the window has no path.'''
+
+    def __init__(self):
+        self.goal   = None
+        self.static = None  # static node costs of the route, -1 for walls
+        self.route  = []
+
+    def search(self, grid, start, goal):
+        '''Same contract as search_path.'''
+        nodes, walls = grid.nodes, grid.walls.mask
+        space = SearchSpace.get(nodes.shape)
+        if start == goal: return []
+        if not (0 <= start[0] < space.shape[0] and 0 <= start[1] < space.shape[1]):
+            return space.search_full(nodes, walls, start, goal)
+        w = PATH_WINDOW_NODES
+        x0, y0 = max(start[0]-w, 0), max(start[1]-w, 0)
+        x1, y1 = min(start[0]+w+1, space.shape[0]), min(start[1]+w+1, space.shape[1])
+        inside = lambda node: x0 <= node[0] < x1 and y0 <= node[1] < y1
+
+        ## global route
+        static = grid.static.costs()
+        static_walls = static < 0
+        if goal != self.goal or not np.array_equal(static, self.static) or not self.follow(inside):
+            self.goal, self.static = goal, static
+            self.route = space.search_full(np.where(static_walls, GRID_NODE_WIDTH*MOVE_COST_UNCERTAIN, static),
+                                      static_walls, start, goal)
+            if not self.route: return space.search_full(nodes, walls, start, goal)
+            self.follow(inside)
+
+        ## local target: the last route node in the window, not covered by a unit
+        j = 0
+        while j+1 < len(self.route) and inside(self.route[j+1]): j += 1
+        while j > 0 and walls[self.route[j]]: j -= 1
+        target = self.route[j]
+        window = SearchSpace.get((x1-x0, y1-y0))
+        path = window.search(nodes[x0:x1, y0:y1], walls[x0:x1, y0:y1], (start[0]-x0, start[1]-y0),
+                             (target[0]-x0, target[1]-y0))
+        if not path and start != target: return space.search_full(nodes, walls, start, goal)
+        return [(x+x0, y+y0) for x, y in path]+self.route[j+1:]
+
+    def follow(self, inside):
+        '''Drops route nodes before the first one in the window. Returns False if there is none.'''
+        for i, node in enumerate(self.route):
+            if inside(node):
+                del self.route[:i]
+                return True
+        return False
@@ -0,0 +1,141 @@
+import numpy as np
+from model.Faction import Faction
+from model.World import World
+
+############################# Columnar world #############################
+
+## wire layouts of fixed-width record runs, see RemoteProcessClient.*_STRUCT
+LIVING_UNIT_DTYPE = np.dtype([('id', '<i8'), ('x', '<f8'), ('y', '<f8'), ('speed_x', '<f8'), ('speed_y', '<f8'),
+                              ('angle', '<f8'), ('faction', 'i1'), ('radius', '<f8'), ('life', '<i4'),
+                              ('max_life', '<i4')])
+BUILDING_TAIL_DTYPE = np.dtype([('type', 'i1'), ('vision_range', '<f8'), ('attack_range', '<f8'),
+                                ('damage', '<i4'), ('cooldown_ticks', '<i4'),
+                                ('remaining_action_cooldown_ticks', '<i4')])
+MINION_TAIL_DTYPE = np.dtype([('type', 'i1'), ('vision_range', '<f8'), ('damage', '<i4'),
+                              ('cooldown_ticks', '<i4'), ('remaining_action_cooldown_ticks', '<i4')])
+
+## struct-of-arrays columns; faction and type are raw wire bytes, -1 is None
+COLUMNS = (('id', np.int64), ('x', np.float64), ('y', np.float64), ('speed_x', np.float64),
+           ('speed_y', np.float64), ('angle', np.float64), ('radius', np.float64), ('life', np.int32),
+           ('max_life', np.int32), ('faction', np.int8), ('type', np.int8))
+
+
+class UnitArrays:
+    '''Units of one type for the current tick as preallocated column arrays.
+    Records are copied in from the receive buffer; model objects are built on demand.'''
+
+    def __init__(self, unit_class, to_enum, tail_dtype=None, type_class=None, capacity=64):
+        self.unit_class = unit_class
+        self.to_enum    = to_enum
+        self.tail_dtype = tail_dtype
+        self.type_class = type_class
+        self.capacity   = 0
+        self.resize(capacity)
+        self.clear(0)
+        self.finish()
+
+    def resize(self, capacity):
+        self.capacity   = capacity
+        self.heads      = np.zeros(capacity, LIVING_UNIT_DTYPE)
+        self.head_bytes = memoryview(self.heads.view(np.uint8))
+        if self.tail_dtype:
+            self.tails      = np.zeros(capacity, self.tail_dtype)
+            self.tail_bytes = memoryview(self.tails.view(np.uint8))
+        self.buffers    = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS}
+        if not self.tail_dtype: self.buffers['type'].fill(-1)
+
+    def clear(self, count):
+        '''Starts a new tick with room for count units.'''
+        if count > self.capacity: self.resize(max(count, 2*self.capacity))
+        self.count      = 0
+        self.statuses   = []
+        self.extras     = []
+        self._units     = None
+
+    def append_head(self, head):
+        '''Adds a unit from wire bytes of its leading fixed-width run.'''
+        size = LIVING_UNIT_DTYPE.itemsize
+        self.head_bytes[self.count*size:(self.count+1)*size] = head
+        self.count += 1
+
+    def append_tail(self, tail):
+        '''Sets wire bytes of the trailing fixed-width run of the last added unit.'''
+        size = self.tail_dtype.itemsize
+        self.tail_bytes[(self.count-1)*size:self.count*size] = tail
+
+    def finish(self):
+        '''Copies staged records into the columns and exposes them trimmed to count.'''
+        n = self.count
+        for name, _ in COLUMNS:
+            if name in LIVING_UNIT_DTYPE.names:  source = self.heads[name]
+            elif self.tail_dtype:                source = self.tails[name]
+            else:                                source = None
+            column = self.buffers[name]
+            if source is not None: np.copyto(column[:n], source[:n])
+            setattr(self, name, column[:n])
+
+    def __len__(self):
+        return self.count
+
+    def unit(self, i):
+        '''Returns model object of the i-th unit.'''
+        head = self.heads[i].item()
+        args = head[:6] + (self.to_enum(Faction, head[6]),) + head[7:] + (self.statuses[i],)
+        if self.tail_dtype:
+            tail = self.tails[i].item()
+            args += (self.to_enum(self.type_class, tail[0]),) + tail[1:]
+        return self.unit_class(*(args + self.extras[i]))
+
+    def units(self):
+        '''Returns model objects of all units, built on first call.'''
+        if self._units is None: self._units = [self.unit(i) for i in range(self.count)]
+        return self._units
+
+
+class IndexedWorld(World):
+    '''World with by_id: id -> unit of wizards, minions, buildings and trees, built on first access.
+    Null records are left out.'''
+
+    _by_id = None
+
+    @property
+    def by_id(self):
+        if self._by_id is None:
+            self._by_id = {o.id: o for units in (self.wizards, self.minions, self.buildings, self.trees) if units
+                           for o in units if o is not None}
+        return self._by_id
+
+
+class ColumnarWorld(IndexedWorld):
+    '''World with wizards, minions, buildings and trees kept as UnitArrays, None for absent lists.
+    The list attributes and by_id are object views built on first access.'''
+
+    def __init__(self, tick_index, tick_count, width, height, players, wizard_arrays, minion_arrays, projectiles,
+                 bonuses, building_arrays, tree_arrays):
+        self.tick_index         = tick_index
+        self.tick_count         = tick_count
+        self.width              = width
+        self.height             = height
+        self.players            = players
+        self.wizard_arrays      = wizard_arrays
+        self.minion_arrays      = minion_arrays
+        self.projectiles        = projectiles
+        self.bonuses            = bonuses
+        self.building_arrays    = building_arrays
+        self.tree_arrays        = tree_arrays
+
+    @property
+    def wizards(self):
+        return self.wizard_arrays.units() if self.wizard_arrays is not None else None
+
+    @property
+    def minions(self):
+        return self.minion_arrays.units() if self.minion_arrays is not None else None
+
+    @property
+    def buildings(self):
+        return self.building_arrays.units() if self.building_arrays is not None else None
+
+    @property
+    def trees(self):
+        return self.tree_arrays.units()